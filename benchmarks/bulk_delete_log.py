@@ -0,0 +1,137 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import ast
+import datetime as dt
+import importlib.util
+import random
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable
+
+import discord
+from discord.utils import escape_markdown
+
+# Times the bulk delete log builders on a 1000 message purge.
+#
+#     python benchmarks/bulk_delete_log.py
+#
+# "before" is the builder on_bulk_message_delete used until BulkDeleteLog, "after" is
+# BulkDeleteLog as it is in extensions/listeners/events.py.
+
+ROOT = Path(__file__).resolve().parent.parent
+MESSAGES = 1000
+RUNS = 20
+
+
+class _Message:
+    __slots__ = ("author", "content", "created_at")
+
+    def __init__(self, author: str, content: str, created_at: dt.datetime) -> None:
+        self.author: str = author
+        self.content: str = content
+        self.created_at: dt.datetime = created_at
+
+
+def _load_timestamp() -> Any:
+    spec = importlib.util.spec_from_file_location("_helpers", ROOT / "utils" / "helpers.py")
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.timestamp
+
+
+def _load_bulk_delete_log(timestamp: Any) -> Any:
+    path = ROOT / "extensions" / "listeners" / "events.py"
+    tree = ast.parse(path.read_text())
+    node = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == "BulkDeleteLog")
+    namespace = {"BytesIO": BytesIO, "discord": discord, "escape_markdown": escape_markdown, "timestamp": timestamp}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), str(path), "exec"), namespace)
+    return namespace["BulkDeleteLog"]
+
+
+def before(messages: list[_Message], timestamp: Any) -> tuple[str | None, discord.File | None]:
+    list_of_messages = []
+    for _message in messages:
+        time = format(timestamp(_message.created_at), "t")
+        content = escape_markdown(_message.content[:90]) or "*No content*"
+        list_of_messages.append(f"[{time}] {_message.author}: {content}")
+    for _message in messages:
+        if len(_message.content) > 100:
+            content = escape_markdown(f"{_message.content[:100]}...")
+        else:
+            content = escape_markdown(_message.content) or "*No content*"
+        list_of_messages.append(f"[{timestamp(_message.created_at):t}] {_message.author}: {content}")
+    message_log = "\n\n----------\n\n".join(list_of_messages)
+
+    if len(message_log) > 4000:
+        return None, discord.File(filename="messages.txt", fp=BytesIO(message_log.encode("utf-8")))
+    return "\n".join(list_of_messages), None
+
+
+def after(messages: list[_Message], bulk_delete_log: Any) -> tuple[str | None, discord.File | None]:
+    log = bulk_delete_log()
+    for message in messages:
+        log.add(message, message.author)
+    message_file = log.to_file("messages.txt")
+    return (None, message_file) if message_file is not None else (log.text, None)
+
+
+def measure(build: Callable[[], tuple[str | None, discord.File | None]]) -> tuple[float, int, int]:
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        build()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    text, message_file = build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = len(message_file.fp.getvalue()) if message_file is not None else len(text or "")
+    return best, peak, size
+
+
+def main() -> None:
+    rng = random.Random(0)
+    now = dt.datetime.now(dt.timezone.utc)
+    messages = [
+        _Message(f"user{rng.randrange(50)}", "".join(rng.choices("abc def_*", k=rng.randrange(400))), now)
+        for _ in range(MESSAGES)
+    ]
+    timestamp = _load_timestamp()
+    bulk_delete_log = _load_bulk_delete_log(timestamp)
+
+    builders: dict[str, Callable[[], tuple[str | None, discord.File | None]]] = {
+        "before": lambda: before(messages, timestamp),
+        "after": lambda: after(messages, bulk_delete_log),
+    }
+    for name, build in builders.items():
+        best, peak, size = measure(build)
+        sys.stdout.write(
+            f"{name:7} {best * 1000:6.2f} ms, peak {peak / 1024:4.0f} KiB, output {size / 1024:4.0f} KiB\n"
+        )
+
+
+if __name__ == "__main__":
+    main()
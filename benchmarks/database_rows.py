@@ -0,0 +1,121 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import gc
+import subprocess
+import sys
+import tracemalloc
+from pathlib import Path
+from types import ModuleType
+from typing import Any
+
+# Measures the memory each cached database row takes, excluding column values.
+#
+#     python benchmarks/database_rows.py              # working tree
+#     python benchmarks/database_rows.py <revision>   # also utils/database.py at a git revision
+
+ROOT = Path(__file__).resolve().parent.parent
+ROWS = 20_000
+
+RECORDS: dict[str, dict[str, Any]] = {
+    "GuildData": {
+        "guild_id": 0,
+        "prefixes": ["a."],
+        "disabled_commands": [],
+        "disabled_channels": [],
+        "auto_unarchive": [],
+    },
+    "LoggingData": {
+        "guild_id": 0,
+        "enabled": True,
+        "webhook": None,
+        "channel_id": 1,
+        "message_delete": True,
+        "message_edit": True,
+        "member_join": False,
+        "member_leave": False,
+        "member_ban": False,
+        "channel_edit": False,
+        "channel_delete": False,
+        "guild_edit": False,
+    },
+    "UserData": {"user_id": 0, "timezone": None, "color": 0, "dmed": True},
+    "HighlightsData": {"user_id": 0, "triggers": ["x"], "blocked": []},
+}
+
+
+class _Database:
+    """
+    Holds the cache dicts that rows register themselves in.
+    """
+
+    def __init__(self) -> None:
+        for name in ("_guilds", "_verification", "_logging", "_join_leave", "_users", "_highlights", "_blacklists"):
+            setattr(self, name, {})
+
+
+def load(revision: str | None) -> ModuleType:
+    path = "utils/database.py"
+    if revision is None:
+        source = (ROOT / path).read_text()
+    else:
+        source = subprocess.run(
+            ["git", "show", f"{revision}:{path}"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+
+    module = ModuleType(f"utils._database_{revision or 'worktree'}")
+    module.__package__ = "utils"
+    exec(compile(source, f"{revision or 'worktree'}:{path}", "exec"), module.__dict__)
+    return module
+
+
+def measure(module: ModuleType, name: str, record: dict[str, Any]) -> float:
+    cls = getattr(module, name)
+    key = next(iter(record))
+    database = _Database()
+    records = [{**record, key: number} for number in range(ROWS)]
+
+    gc.collect()
+    tracemalloc.start()
+    rows = []
+    for data in records:
+        row = cls(data[key], database)
+        # Rows before the __slots__ layout copied the record into a _data dict.
+        if hasattr(row, "_data"):
+            row._data.update(data)
+        else:
+            row._load(data)
+        rows.append(row)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / ROWS
+
+
+def main() -> None:
+    sys.path.insert(0, str(ROOT))
+    revisions: list[str | None] = [*sys.argv[1:], None]
+    for revision in revisions:
+        module = load(revision)
+        for name, record in RECORDS.items():
+            sys.stdout.write(f"{revision or 'worktree':10} {name:15} {measure(module, name, record):7.0f} bytes/row\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -20,3 +20,4 @@ from .alpine import *
 from .checks import *
 from .context import *
 from .core import *
+from .state import *
@@ -22,7 +22,10 @@ import asyncio
 import datetime as dt
 import logging
 import re
+import sys
+import time
 from asyncio import timeout
+from collections import Counter
 from datetime import datetime
 from typing import TYPE_CHECKING, Any, Callable, ClassVar, Mapping
 
@@ -40,13 +43,27 @@ from somerandomapi import Client as SRClient
 from topgg.client import DBLClient
 from topgg.webhook import WebhookManager
 
-from utils import Database
+from utils import (
+    ChunkScheduler,
+    Database,
+    LatencyTracker,
+    LoopMonitor,
+    LRUCache,
+    Redactor,
+    WebhookDispatcher,
+    current_invocation,
+)
+
+from .state import ConnectionState
 
 if TYPE_CHECKING:
     from core import Cog, Context
     from extensions.listeners.errorhandler import ErrorHandler
 
-__all__ = ("Bot",)
+__all__ = (
+    "Bot",
+    "CommandInfo",
+)
 
 jishaku.Flags.HIDE = True
 jishaku.Flags.NO_UNDERSCORE = True
@@ -73,6 +90,33 @@ _log.addHandler(handler)
 logging.getLogger("wavelink").addHandler(handler)
 
 
+class CommandInfo:
+    """
+    Whether a message invokes a command, resolved once per message content.
+    """
+
+    __slots__ = ("command", "content", "invoked_with", "prefix")
+
+    def __init__(
+        self,
+        content: str,
+        prefix: str | None = None,
+        invoked_with: str | None = None,
+        command: commands.Command | None = None,
+    ) -> None:
+        self.content: str = content
+        self.prefix: str | None = prefix
+        self.invoked_with: str | None = invoked_with
+        self.command: commands.Command | None = command
+
+    def __repr__(self) -> str:
+        return f"<CommandInfo prefix={self.prefix!r} invoked_with={self.invoked_with!r} command={self.command}>"
+
+    @property
+    def valid(self) -> bool:
+        return self.prefix is not None and self.command is not None
+
+
 class Bot(commands.Bot):
     user: discord.ClientUser
     cogs: Mapping[str, Cog]
@@ -82,7 +126,7 @@ class Bot(commands.Bot):
     maintenance: bool = False
     commands_ran: int = 0
     command_usage: ClassVar[dict[str, int]] = {}
-    command_cache: ClassVar[dict[int, discord.Message]] = {}
+    command_cache: ClassVar[LRUCache[int, discord.PartialMessage]] = LRUCache(maxsize=10000, ttl=1800)
     invite: str = discord.utils.oauth_url(BOT_ID, permissions=discord.Permissions(8))
     support: str = "https://discord.gg/hWhGQ4QHE9"
     source: str = "https://github.com/avizum/alpine"
@@ -104,6 +148,7 @@ class Bot(commands.Bot):
         "extensions.cogs.settings",
         "extensions.cogs.support",
         "extensions.cogs.verification",
+        "extensions.extras.metrics",
         "extensions.extras.setup",
         "extensions.extras.topgg",
         "extensions.listeners.errorhandler",
@@ -136,13 +181,60 @@ class Bot(commands.Bot):
                 message_content=True,
             ),
             status=discord.Status.idle,
-            chunk_guilds_at_startup=True,
-            max_messages=5000,
+            chunk_guilds_at_startup=False,
+            max_messages=self.settings.get("message_cache", {}).get("max_messages", 10000),
             owner_ids=OWNER_IDS,
         )
         self.token: str
+        self._prefix_cache: dict[int | None, tuple[list[str], re.Pattern[str]]] = {}
+        self._prefix_user_id: int | None = None
+        self._command_info: LRUCache[int, CommandInfo] = LRUCache(maxsize=2000, ttl=60)
+        self.redactor: Redactor = Redactor.from_settings(self.settings, sys.path)
+        self.gateway_events: Counter[str] = Counter()
+        monitor_options = self.settings.get("monitor", {})
+        self.loop_monitor: LoopMonitor = LoopMonitor(threshold=monitor_options.get("stall_threshold_ms", 250) / 1000)
+        self.command_timings: LatencyTracker = LatencyTracker()
+        self.listener_timings: LatencyTracker = LatencyTracker()
+        self.webhooks: WebhookDispatcher = WebhookDispatcher()
+        chunk_options = self.settings.get("chunking", {})
+        self.chunker: ChunkScheduler = ChunkScheduler(
+            self,
+            concurrency=chunk_options.get("concurrency", 2),
+            idle_after=chunk_options.get("evict_idle_minutes", 0) * 60 or None,
+        )
+        self.chunker.is_priority = self._chunk_priority
         self._BotBase__cogs: dict[str, Cog] = commands.core._CaseInsensitiveDict()
 
+    def _get_state(self, **options: Any) -> ConnectionState:
+        cache = self.settings.get("message_cache", {})
+        return ConnectionState(
+            dispatch=self.dispatch,
+            handlers=self._handlers,
+            hooks=self._hooks,
+            http=self.http,
+            per_guild=cache.get("per_guild", 200),
+            **options,
+        )
+
+    def _chunk_priority(self, guild_id: int) -> bool:
+        # Features that act on members without a command being run.
+        settings = self.database.get_guild(guild_id)
+        if settings is None:
+            return False
+        logging, join_leave = settings.logging, settings.join_leave
+        return bool(
+            (logging and logging.enabled) or (join_leave and join_leave.enabled) or settings.verification is not None
+        )
+
+    @property
+    def member_total(self) -> int:
+        """
+        Members across all guilds as reported by Discord, counting people in several guilds once per guild.
+
+        Unlike ``users``, this does not depend on which guilds have been chunked.
+        """
+        return sum(guild.member_count or 0 for guild in self.guilds)
+
     def __repr__(self) -> str:
         return f"<Bot id={self.user.id} name={self.user.name!r} discriminator={self.user.discriminator!r}>"
 
@@ -158,20 +250,20 @@ class Bot(commands.Bot):
         self.sr: SRClient = SRClient()
         self.dagpi: DagpiClient = DagpiClient(self.api["DagpiAPI"], session=self.session)
         self.myst: mystbin.Client = mystbin.Client(session=self.session)
+        self.loop_monitor.start()
+        self.chunker.start()
         self.loop.create_task(self.load_extensions())
         self.loop.create_task(self.start_nodes())
         self.loop.create_task(self.find_restart_message())
         self.topgg_webhook.run(8025)
 
-    async def get_prefix(self, message: discord.Message) -> list[str]:
+    def _compile_prefixes(self, guild_id: int | None) -> tuple[list[str], re.Pattern[str]]:
         base: list[str] = [f"<@{self.user.id}>", f"<@!{self.user.id}>"]
 
         if BOT_ID == BETA_BOT_ID:
             base.extend(BETA_PREFIXES)
-            return base
-
-        if message.guild:
-            guild_settings = self.database.get_guild(message.guild.id)
+        elif guild_id is not None:
+            guild_settings = self.database.get_guild(guild_id)
             if not guild_settings or (guild_settings and not guild_settings.prefixes):
                 base.extend(DEFAULT_PREFIXES)
             else:
@@ -180,11 +272,109 @@ class Bot(commands.Bot):
             base.extend(DEFAULT_PREFIXES)
         prefixes = "|".join(map(re.escape, base))
 
-        match = re.match(rf"^({prefixes}\s*).*", message.content, flags=re.IGNORECASE)
+        return base, re.compile(rf"^({prefixes}\s*)", flags=re.IGNORECASE)
+
+    def invalidate_prefixes(self, guild_id: int | None = None) -> None:
+        """
+        Drops the compiled prefixes of a guild, or of every guild if no ID is given.
+        """
+        if guild_id is None:
+            self._prefix_cache.clear()
+        else:
+            self._prefix_cache.pop(guild_id, None)
+        self._command_info.clear()
+
+    def reload_settings(self) -> None:
+        """
+        Reloads config.toml and rebuilds everything derived from it.
+        """
+        with open("config.toml") as config:
+            self.settings = toml.loads(config.read())
+        self.api = self.settings["api_tokens"]
+        self.news = self.settings["news"]["news"]
+        self.redactor = Redactor.from_settings(self.settings, sys.path)
+
+    async def get_prefix(self, message: discord.Message) -> list[str]:
+        if self._prefix_user_id != self.user.id:
+            self._prefix_cache.clear()
+            self._prefix_user_id = self.user.id
+
+        guild_id = message.guild.id if message.guild else None
+        cached = self._prefix_cache.get(guild_id)
+        if cached is None:
+            cached = self._compile_prefixes(guild_id)
+            # Custom prefixes are unknown until the database cache is warm, so only
+            # the mention and default prefixes work until then.
+            if self.database.is_ready():
+                self._prefix_cache[guild_id] = cached
+
+        base, pattern = cached
+        base = base.copy()
+        if BOT_ID == BETA_BOT_ID:
+            return base
+
+        match = pattern.match(message.content)
         if match:
             base.append(match[1])
         return base
 
+    async def get_command_info(self, message: discord.Message) -> CommandInfo:
+        """
+        Resolves the prefix and command a message would invoke without building a Context.
+
+        The result is reused by every listener that handles the same message content.
+        """
+        info = self._command_info.get(message.id)
+        if info is not None and info.content == message.content:
+            return info
+
+        content = message.content
+        info = CommandInfo(content)
+        prefix = discord.utils.find(content.startswith, await self.get_prefix(message))
+        if prefix is not None:
+            info.prefix = prefix
+            rest = content[len(prefix) :]
+            if self.strip_after_prefix:
+                rest = rest.lstrip()
+            info.invoked_with = rest.split(maxsplit=1)[0] if rest and not rest[0].isspace() else ""
+            info.command = self.all_commands.get(info.invoked_with)
+
+        self._command_info[message.id] = info
+        return info
+
+    async def process_commands(self, message: discord.Message, /) -> None:
+        if message.author.bot:
+            return
+        info = await self.get_command_info(message)
+        if info.prefix is None:
+            return
+        await super().process_commands(message)
+
+    async def invoke(self, ctx: commands.Context[Any], /) -> None:
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        # Keep the invoking message cached for edit reinvokes and response cleanup on delete.
+        if self._connection.message_store is not None:
+            self._connection.message_store.protect(ctx.message)
+
+        name = ctx.command.qualified_name
+        token = current_invocation.set(name)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            # Subcommands are resolved during invoke, so time them under the command that actually ran.
+            self.command_timings.record(ctx.command.qualified_name, time.perf_counter() - start)
+            current_invocation.reset(token)
+
+    async def _run_event(self, coro: Callable[..., Any], event_name: str, *args: Any, **kwargs: Any) -> None:
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            self.listener_timings.record(getattr(coro, "__qualname__", event_name), time.perf_counter() - start)
+
     async def load_extensions(self) -> None:
         for ext in self.to_load:
             try:
@@ -228,6 +418,8 @@ class Bot(commands.Bot):
 
     async def on_ready(self) -> None:
         _log.info(f"Running: {self.user.name} ({self.user.id})")
+        await self.database.wait_until_ready()
+        _log.info(f"Queued {self.chunker.warm_up()} guilds for member chunking")
 
     async def wait_for(
         self,
@@ -272,10 +464,19 @@ class Bot(commands.Bot):
             return
         await self.process_commands(after)
 
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        self.chunker.forget(guild.id)
+
     async def on_message_delete(self, message: discord.Message) -> None:
-        if message.id in self.command_cache:
-            await self.command_cache[message.id].delete(delay=0)
-            self.command_cache.pop(message.id, None)
+        response = self.command_cache.pop(message.id)
+        if response is not None:
+            await response.delete(delay=0)
+
+    def dispatch(self, event_name: str, /, *args: Any, **kwargs: Any) -> None:
+        # Counted here so that counting gateway events does not schedule a listener task for each one.
+        if event_name == "socket_event_type":
+            self.gateway_events[args[0]] += 1
+        super().dispatch(event_name, *args, **kwargs)
 
     def run(self, *args: Any, **kwargs: Any) -> None:
         if not self.token:
@@ -283,8 +484,8 @@ class Bot(commands.Bot):
         super().run(self.token, *args, **kwargs, reconnect=True)
 
     async def close(self) -> None:
-        await self.session.close()
-        await self.sr.close()
+        self.loop_monitor.stop()
+        self.chunker.stop()
 
         # Cope
         for view in list(self._connection._view_store._synced_message_views.values()):
@@ -307,4 +508,10 @@ class Bot(commands.Bot):
                 pass
 
         _log.info(f"Stopped: {self.user.name} ({self.user.id})")
+        # Logging webhooks are sent over the bot's HTTP session, so drain them before it is closed.
+        await self.webhooks.close()
+        # Cogs are unloaded here and may still flush to the database or send webhooks.
         await super().close()
+        await self.database.close()
+        await self.session.close()
+        await self.sr.close()
@@ -20,7 +20,6 @@ from __future__ import annotations
 
 import datetime
 import re
-import sys
 from typing import TYPE_CHECKING, Any, Generic, Sequence, TypeVar, overload
 
 import discord
@@ -35,12 +34,11 @@ from utils.paginators import Paginator, WrappedPaginator
 from utils.views import View as AView
 
 if TYPE_CHECKING:
-    from asyncpg import Pool
     from discord import AllowedMentions, Embed, File, GuildSticker, Message, MessageReference, PartialMessage, StickerItem
     from discord.ui.view import BaseView
 
     from extensions.cogs.music.cog import Player
-    from utils import Database
+    from utils import Database, InstrumentedPool
 
     from .alpine import Bot
 
@@ -139,18 +137,17 @@ class Context(commands.Context, Generic[BotT_co]):
         self.locally_handled: bool = False
         if self.interaction:
             self.message.content = f"/{self.invoked_with}"
-        tokens: list[str] = []
-        tokens.extend(self.bot.settings["bot_tokens"].values())
-        tokens.extend(self.bot.settings["api_tokens"].values())
-        tokens.extend(self.bot.settings["webhooks"].values())
-        self.tokens: list[str] = tokens
+
+    @property
+    def tokens(self) -> list[str]:
+        return self.bot.redactor.candidates
 
     @property
     def database(self) -> Database:
         return self.bot.database
 
     @property
-    def pool(self) -> Pool:
+    def pool(self) -> InstrumentedPool:
         return self.bot.database.pool
 
     @property
@@ -180,9 +177,9 @@ class Context(commands.Context, Generic[BotT_co]):
 
     async def fetch_color(self, member: discord.Member | discord.User | None = None) -> discord.Color:
         member = member or self.author
-        data = await self.database.fetch_user(member.id)
+        data = await self.database.find_user(member.id)
         color = None
-        if data is not None and data.color is not None:
+        if data is not None and data.color:
             color = discord.Color(data.color)
         if not color:
             color = member.color
@@ -224,14 +221,18 @@ class Context(commands.Context, Generic[BotT_co]):
         )
         return await menu.start()
 
+    def cache_response(self, message: Message) -> None:
+        partial = discord.PartialMessage(channel=message.channel, id=message.id)  # type: ignore
+        self.bot.command_cache[self.message.id] = partial
+
     async def send_and_cache(self, *args: Any, **kwargs: Any) -> Message:
         message = await super().send(*args, **kwargs)
-        self.bot.command_cache[self.message.id] = message
+        self.cache_response(message)
         return message
 
-    async def edit_and_recache(self, message: discord.Message, *args: Any, **kwargs: Any) -> Message:
+    async def edit_and_recache(self, message: Message | PartialMessage, *args: Any, **kwargs: Any) -> Message:
         message = await message.edit(*args, **kwargs)
-        self.bot.command_cache[self.message.id] = message
+        self.cache_response(message)
         return message
 
     @overload
@@ -392,11 +393,7 @@ class Context(commands.Context, Generic[BotT_co]):
         poll: discord.Poll = MISSING,
     ) -> Message:
         if content:
-            content = str(content)
-            for token in self.tokens:
-                content = content.replace(token, "[configuration token omitted]")
-            for path in sys.path:
-                content = content.replace(path, "[PATH]")
+            content = self.bot.redactor.redact(str(content))
             if len(content) >= 2000:
                 if paginate:
                     return await self.paginate(content, remove_view_after=True)
@@ -435,7 +432,8 @@ class Context(commands.Context, Generic[BotT_co]):
             "poll": poll,
         }
 
-        if self.message.id in self.bot.command_cache and self.message.edited_at and not no_edit:
+        cached = self.bot.command_cache.get(self.message.id) if self.message.edited_at and not no_edit else None
+        if cached is not None:
             edit_kwargs = kwargs.copy()
             try:
                 to_pop = (
@@ -455,8 +453,7 @@ class Context(commands.Context, Generic[BotT_co]):
                 edit_kwargs["embed"] = embed
                 edit_kwargs["embeds"] = MISSING if embeds is None else embeds
                 edit_kwargs["suppress"] = suppress_embeds
-                message = self.bot.command_cache[self.message.id]
-                return await self.edit_and_recache(message, **edit_kwargs)
+                return await self.edit_and_recache(cached, **edit_kwargs)
             except discord.HTTPException:
                 return await self.send_and_cache(**kwargs)
 
@@ -19,6 +19,7 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 from __future__ import annotations
 
 import datetime
+import time
 from typing import TYPE_CHECKING, Any, Callable, Concatenate, Generic, Literal, ParamSpec, TypeVar, Unpack, overload
 
 import discord
@@ -98,6 +99,27 @@ class Command(commands.Command, Generic[CogT, P, T]):
     def __repr__(self) -> str:
         return f"<Command name={self.qualified_name}>"
 
+    def _record(self, ctx: Context[Any], phase: str, elapsed: float) -> None:
+        timings = getattr(ctx.bot, "command_timings", None)
+        if timings is not None:
+            timings.record(f"{self.qualified_name} ({phase})", elapsed)
+
+    async def can_run(self, ctx: Context[Any], /) -> bool:
+        start = time.perf_counter()
+        try:
+            return await super().can_run(ctx)
+        finally:
+            # The help command also calls this while filtering, only time actual invocations.
+            if ctx.command is self:
+                self._record(ctx, "checks", time.perf_counter() - start)
+
+    async def _parse_arguments(self, ctx: Context[Any]) -> None:
+        start = time.perf_counter()
+        try:
+            await super()._parse_arguments(ctx)
+        finally:
+            self._record(ctx, "converters", time.perf_counter() - start)
+
 
 class Group(commands.Group, Command[CogT, P, T]):
     def __init__(self, *args, **kwargs) -> None:
@@ -22,6 +22,7 @@ __all__ = (
     "Blacklisted",
     "CommandDisabledChannel",
     "CommandDisabledGuild",
+    "DatabaseNotReady",
     "Maintenance",
     "NotGuildOwner",
 )
@@ -42,6 +43,10 @@ class Maintenance(commands.CheckFailure):
     pass
 
 
+class DatabaseNotReady(commands.CheckFailure):
+    pass
+
+
 class CommandDisabledGuild(commands.DisabledCommand):
     pass
 
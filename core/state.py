@@ -0,0 +1,191 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+from discord import state
+
+if TYPE_CHECKING:
+    from discord import Message
+
+__all__ = (
+    "ConnectionState",
+    "MessageStore",
+)
+
+# Rough per-message memory costs, used for accounting only.
+MESSAGE_OVERHEAD = 2048
+EMBED_OVERHEAD = 1024
+ATTACHMENT_OVERHEAD = 512
+
+
+def _estimate(message: Message) -> int:
+    return (
+        MESSAGE_OVERHEAD
+        + len(message.content)
+        + EMBED_OVERHEAD * len(message.embeds)
+        + ATTACHMENT_OVERHEAD * len(message.attachments)
+    )
+
+
+class MessageStore:
+    """
+    Message cache with a budget per guild, used in place of discord.py's single deque.
+
+    Messages are kept in one insertion-ordered index, so iteration behaves like the deque it
+    replaces. Each guild keeps at most ``per_guild`` messages. Past ``max_messages`` in total,
+    the oldest messages are evicted, protected messages last.
+    """
+
+    def __init__(self, max_messages: int, *, per_guild: int = 200) -> None:
+        self.max_messages: int = max_messages
+        self.per_guild: int = per_guild
+        # message ID -> message, oldest first
+        self._messages: OrderedDict[int, Message] = OrderedDict()
+        # IDs of messages that are not protected, oldest first
+        self._regular: OrderedDict[int, None] = OrderedDict()
+        # guild ID -> message ID -> estimated size, oldest first
+        self._guilds: dict[int | None, OrderedDict[int, int]] = {}
+        self._memory: dict[int | None, int] = {}
+
+    def __repr__(self) -> str:
+        return f"<MessageStore messages={len(self)} guilds={len(self._guilds)} memory={self.memory}>"
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages.values())
+
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self._messages.values())
+
+    def __getitem__(self, index: Any) -> Any:
+        return list(self._messages.values())[index]
+
+    def __contains__(self, message: object) -> bool:
+        return getattr(message, "id", None) in self._messages
+
+    @property
+    def memory(self) -> int:
+        return sum(self._memory.values())
+
+    def get(self, message_id: int) -> Message | None:
+        return self._messages.get(message_id)
+
+    def _forget(self, message_id: int) -> Message | None:
+        message = self._messages.pop(message_id, None)
+        if message is None:
+            return None
+        self._regular.pop(message_id, None)
+        guild_id = message.guild.id if message.guild else None
+        messages = self._guilds[guild_id]
+        self._memory[guild_id] -= messages.pop(message_id)
+        if not messages:
+            del self._guilds[guild_id]
+            del self._memory[guild_id]
+        return message
+
+    def append(self, message: Message) -> None:
+        guild_id = message.guild.id if message.guild else None
+        self._forget(message.id)
+
+        messages = self._guilds.get(guild_id)
+        if messages is None:
+            messages = self._guilds[guild_id] = OrderedDict()
+            self._memory[guild_id] = 0
+        size = _estimate(message)
+        self._messages[message.id] = message
+        self._regular[message.id] = None
+        messages[message.id] = size
+        self._memory[guild_id] += size
+
+        while len(messages) > self.per_guild:
+            self._forget(next(iter(messages)))
+
+        while len(self._messages) > self.max_messages:
+            self._forget(next(iter(self._regular or self._messages)))
+
+    def remove(self, message: Message) -> None:
+        if self._forget(message.id) is None:
+            raise ValueError("message is not cached")
+
+    def protect(self, message: Message) -> None:
+        """
+        Evicts a cached message last when the store is full, e.g. one that invoked a command.
+        """
+        self._regular.pop(message.id, None)
+
+    def reset(self, messages: Iterable[Message] = ()) -> None:
+        # Consumed first, the iterable may be a generator over this store.
+        messages = list(messages)
+        self._messages.clear()
+        self._regular.clear()
+        self._guilds.clear()
+        self._memory.clear()
+        for message in messages:
+            self.append(message)
+
+    def usage(self, limit: int | None = None) -> list[tuple[int | None, int, int]]:
+        """
+        Returns (guild ID, cached messages, estimated bytes) for each guild, largest first.
+        """
+        usage = sorted(
+            ((guild_id, len(messages), self._memory[guild_id]) for guild_id, messages in self._guilds.items()),
+            key=lambda item: item[2],
+            reverse=True,
+        )
+        return usage[:limit]
+
+
+class ConnectionState(state.ConnectionState):
+    """
+    Connection state that stores messages in a MessageStore.
+
+    discord.py assigns a new deque to ``_messages`` when it clears its state or leaves a guild,
+    so the attribute is a property that loads those messages into the store instead.
+    """
+
+    message_store: MessageStore | None = None
+
+    def __init__(self, *, per_guild: int = 200, **options: Any) -> None:
+        super().__init__(**options)
+        if self.message_store is not None:
+            self.message_store.per_guild = per_guild
+
+    @property
+    def _messages(self) -> MessageStore | None:
+        return self.message_store
+
+    @_messages.setter
+    def _messages(self, messages: Iterable[Message] | None) -> None:
+        if messages is None or self.max_messages is None:
+            self.message_store = None
+            return
+        if self.message_store is None:
+            self.message_store = MessageStore(self.max_messages)
+        if messages is not self.message_store:
+            self.message_store.reset(messages)
+
+    def _get_message(self, msg_id: int | None) -> Message | None:
+        if self.message_store is None or msg_id is None:
+            return None
+        return self.message_store.get(msg_id)
@@ -57,32 +57,28 @@ class BotInfo(core.Cog, name="Bot Info"):
 
     @core.Cog.listener()
     async def on_message(self, message: discord.Message) -> None:
-        ctx: Context = await self.bot.get_context(message)
         if message.author == self.bot.user:
             return
-        if message.content in [
+        if message.guild and message.content in [
             f"<@{self.bot.user.id}>",
             f"<@!{self.bot.user.id}>",
         ]:
-            guild_data = ctx.database.get_guild(ctx.guild.id)
+            guild_data = self.bot.database.get_guild(message.guild.id)
             if (
-                not ctx.bot_permissions.send_messages
+                not message.channel.permissions_for(message.guild.me).send_messages
                 or not guild_data
-                or (guild_data and ctx.channel.id in guild_data.disabled_channels)
+                or (guild_data and message.channel.id in guild_data.disabled_channels)
             ):
                 return
 
-            prefixes = guild_data.prefixes or []
-            prefixes.insert(0, f"@{ctx.me.display_name}")
+            prefixes = guild_data.prefixes.copy()
+            prefixes.insert(0, f"@{message.guild.me.display_name}")
             if len(prefixes) == 1:
                 prefixes.append("a.")
             content = f"The prefixes are:\n`{'` | `'.join(prefixes)}`"
 
             await message.reply(content)
 
-        if message.guild and not message.guild.chunked:
-            await message.guild.chunk()
-
     @core.command()
     async def news(self, ctx: Context):
         """
@@ -112,7 +108,7 @@ class BotInfo(core.Cog, name="Bot Info"):
         )
         embed.add_field(
             name="Stats",
-            value=f"{len(self.bot.guilds)} Servers\n{len(self.bot.users)} Users",
+            value=f"{len(self.bot.guilds)} Servers\n{self.bot.member_total:,} Members",
         )
         embed.set_thumbnail(url=ctx.me.display_avatar.url)
         owner = self.bot.get_user(750135653638865017)
@@ -489,7 +485,7 @@ class BotInfo(core.Cog, name="Bot Info"):
         )
         conf = await ctx.confirm(embed=embed)
         if conf.result:
-            user_settings = ctx.database.get_user(ctx.author.id)
+            user_settings = await ctx.database.find_user(ctx.author.id)
             highlights = ctx.database.get_highlights(ctx.author.id)
             if not user_settings and not highlights:
                 return await ctx.send("You are not in my database.")
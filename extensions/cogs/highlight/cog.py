@@ -34,6 +34,7 @@ class HighlightCommands(core.Cog):
         self.load_time = datetime.datetime.now(datetime.timezone.utc)
         self.emoji = "\U0001f58b"
         self.bot = bot
+        super().__init__(bot)
 
     @core.group(hybrid=True)
     async def highlight(self, ctx: Context):
@@ -0,0 +1,121 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections import OrderedDict, deque
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import discord
+
+__all__ = (
+    "CachedMessage",
+    "MessageBuffer",
+)
+
+
+class CachedMessage:
+    __slots__ = ("author", "content", "created_at", "id")
+
+    def __init__(self, message_id: int, author: str, content: str, created_at: datetime.datetime) -> None:
+        self.id: int = message_id
+        self.author: str = author
+        self.content: str = content
+        self.created_at: datetime.datetime = created_at
+
+    def __repr__(self) -> str:
+        return f"<CachedMessage id={self.id} author={self.author!r}>"
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> CachedMessage:
+        return cls(message.id, str(message.author), message.content, message.created_at)
+
+
+class MessageBuffer:
+    """
+    Keeps the most recent messages of each channel for highlight context.
+
+    Each channel holds at most ``size`` messages no older than ``max_age`` seconds,
+    and the least recently active channels are dropped past ``max_channels``.
+    """
+
+    def __init__(self, *, size: int = 25, max_age: float = 300, max_channels: int = 5000) -> None:
+        self.size: int = size
+        self.max_age: datetime.timedelta = datetime.timedelta(seconds=max_age)
+        self.max_channels: int = max_channels
+        self._channels: OrderedDict[int, deque[CachedMessage]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"<MessageBuffer channels={len(self._channels)}>"
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._channels.values())
+
+    def _prune(self, messages: deque[CachedMessage]) -> None:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - self.max_age
+        while messages and messages[0].created_at < cutoff:
+            messages.popleft()
+
+    def append(self, message: discord.Message) -> None:
+        messages = self._channels.get(message.channel.id)
+        if messages is None:
+            messages = self._channels[message.channel.id] = deque(maxlen=self.size)
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(message.channel.id)
+            self._prune(messages)
+        messages.append(CachedMessage.from_message(message))
+
+    def edit(self, channel_id: int, message_id: int, content: str) -> None:
+        for cached in self._channels.get(channel_id, ()):
+            if cached.id == message_id:
+                cached.content = content
+                return
+
+    def remove(self, channel_id: int, message_id: int) -> None:
+        messages = self._channels.get(channel_id)
+        if not messages:
+            return
+        for cached in messages:
+            if cached.id == message_id:
+                messages.remove(cached)
+                return
+
+    def discard_channel(self, channel_id: int) -> None:
+        self._channels.pop(channel_id, None)
+
+    def around(self, channel_id: int, message_id: int, *, before: int = 4, after: int = 4) -> list[CachedMessage] | None:
+        """
+        Returns the message and the messages around it, oldest first.
+
+        Returns None if the buffer can not cover the requested messages before it.
+        """
+        messages = self._channels.get(channel_id)
+        if not messages:
+            return None
+        self._prune(messages)
+
+        for index, cached in enumerate(messages):
+            if cached.id == message_id:
+                if index < before:
+                    return None
+                return list(messages)[index - before : index + after + 1]
+        return None
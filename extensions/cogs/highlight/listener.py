@@ -20,7 +20,6 @@ from __future__ import annotations
 
 import asyncio
 import contextlib
-import re
 from typing import TYPE_CHECKING
 
 import discord
@@ -28,6 +27,9 @@ import discord
 import core
 from utils import timestamp
 
+from .history import CachedMessage, MessageBuffer
+from .scheduler import HighlightScheduler, PendingHighlight
+
 if TYPE_CHECKING:
     from core import Bot
     from utils import HighlightsData
@@ -35,8 +37,38 @@ if TYPE_CHECKING:
 
 class HighlightListener(core.Cog):
     def __init__(self, bot: Bot) -> None:
-        self.bot = bot
+        super().__init__(bot)
         self.raw_highlights: dict[int, HighlightsData] = self.bot.database._highlights
+        # guild_id -> IDs of highlight users that are members of that guild
+        self.guild_subscribers: dict[int, set[int]] = {}
+        self.scheduler: HighlightScheduler = HighlightScheduler(self.dispatch_highlight, delay=25)
+        self.message_buffer: MessageBuffer = MessageBuffer(size=25, max_age=300)
+        self._context_fetches: dict[int, asyncio.Task[list[CachedMessage]]] = {}
+
+    async def cog_load(self) -> None:
+        self.scheduler.start()
+        self.bot.loop.create_task(self.build_guild_subscribers())
+
+    async def cog_unload(self) -> None:
+        self.scheduler.stop()
+
+    async def build_guild_subscribers(self) -> None:
+        await self.bot.wait_until_ready()
+        await self.bot.database.wait_until_ready()
+        self.guild_subscribers.clear()
+        for user_id in list(self.raw_highlights):
+            self.add_subscriber(user_id)
+
+    def add_subscriber(self, user_id: int) -> None:
+        for guild in self.bot.guilds:
+            if guild.get_member(user_id) is not None:
+                self.guild_subscribers.setdefault(guild.id, set()).add(user_id)
+
+    def remove_subscriber(self, user_id: int) -> None:
+        for guild_id, subscribers in list(self.guild_subscribers.items()):
+            subscribers.discard(user_id)
+            if not subscribers:
+                del self.guild_subscribers[guild_id]
 
     def is_valid(self, message: discord.Message) -> bool:
         return not (message.guild is None or message.author.bot or message.webhook_id or message.content is None)
@@ -44,31 +76,63 @@ class HighlightListener(core.Cog):
     def can_see_channel(self, member: discord.Member, channel: discord.abc.MessageableChannel):
         return channel.permissions_for(member).read_messages
 
-    async def notify_user(self, message: discord.Message, member: discord.Member, trigger: str):
+    async def dispatch_highlight(self, pending: PendingHighlight) -> None:
+        guild = self.bot.get_guild(pending.guild_id)
+        if guild is None:
+            return
+        member = guild.get_member(pending.user_id)
+        if member is None and not guild.chunked:
+            # The guild's members may have been dropped while it was idle.
+            await self.bot.chunker.request(guild)
+            member = guild.get_member(pending.user_id)
+        if member is None:
+            return
+        await self.notify_user(list(pending.messages), member, pending.triggers)
+
+    async def _fetch_context(self, message: discord.Message) -> list[CachedMessage]:
+        return [
+            CachedMessage.from_message(msg)
+            async for msg in message.channel.history(limit=9, around=message, oldest_first=True)
+        ]
+
+    async def get_context_messages(self, message: discord.Message) -> list[CachedMessage]:
+        cached = self.message_buffer.around(message.channel.id, message.id)
+        if cached is not None:
+            return cached
+
+        # Users highlighted by the same message share a single history request.
+        task = self._context_fetches.get(message.id)
+        if task is None:
+            task = asyncio.create_task(self._fetch_context(message))
+            self._context_fetches[message.id] = task
+            self.bot.loop.call_later(30, self._context_fetches.pop, message.id, None)
+        return await task
+
+    async def notify_user(self, highlighted: list[discord.Message], member: discord.Member, triggers: list[str]):
+        message = highlighted[-1]
         assert message.guild is not None
 
         if not self.can_see_channel(member, message.channel):
             return
 
+        authors = ", ".join(dict.fromkeys(f"{msg.author.mention} ({msg.author.id})" for msg in highlighted))
         embed = discord.Embed(
-            title=f"Highlight trigger: {trigger}",
-            description=(
-                f"In the server {message.guild.name}, you were highlighted"
-                f" by {message.author.mention} ({message.author.id}).\n{message.jump_url}"
-            ),
+            title=f"Highlight trigger: {', '.join(triggers)}",
+            description=f"In the server {message.guild.name}, you were highlighted by {authors}.\n{message.jump_url}",
             color=0x30C5FF,
-            timestamp=message.created_at,
+            timestamp=highlighted[0].created_at,
         )
 
+        highlighted_ids = {msg.id for msg in highlighted}
         messages: list[str] = []
         contents: list[str] = []
-        async for msg in message.channel.history(limit=9, around=message, oldest_first=True):
+        for msg in await self.get_context_messages(message):
             time = format(timestamp(msg.created_at), "t")
             author = msg.author
             content = msg.content
 
             prefix = f"[{time}]"
-            if msg.id == message.id:
+            if msg.id in highlighted_ids:
                 prefix = f"**[{time}]**"
             fmt_content = f"{prefix} @{author}: {content}"
             joined_len = len("\n".join(contents))
@@ -98,39 +162,97 @@ class HighlightListener(core.Cog):
 
     @core.Cog.listener()
     async def on_message(self, message: discord.Message):
+        if message.guild is None:
+            return
+
+        guild = message.guild
+        subscribers = self.guild_subscribers.get(guild.id)
+        if subscribers:
+            self.message_buffer.append(message)
+
         if not self.is_valid(message):
             return
 
-        assert message.guild is not None
+        self.scheduler.cancel(message.author.id, message.channel.id)
 
-        highlight_list = []
-        for user_id, highlight in self.bot.database._highlights.items():
+        index = self.bot.database.highlight_index
+        if not subscribers and not guild.chunked:
+            # Subscribers are only known once the guild's members are cached, which is
+            # only worth waiting for when the message contains someone's trigger.
+            if not index.search(message.content):
+                return
+            await self.bot.chunker.request(guild)
+            subscribers = {user_id for user_id in self.raw_highlights if guild.get_member(user_id) is not None}
+            if subscribers:
+                self.guild_subscribers[guild.id] = subscribers
+
+        if not subscribers:
+            return
+
+        matches = index.search(message.content, subscribers)
+        for user_id, trigger in matches.items():
             if user_id == message.author.id:
                 continue
 
+            highlight = self.bot.database.get_highlights(user_id)
+            if highlight is None:
+                continue
+
             if (highlight.blocked and message.author.id in highlight.blocked) or message.channel.id in highlight.blocked:
                 continue
 
-            highlight_list = highlight.triggers.copy()
+            self.scheduler.schedule(user_id, message, trigger)
 
-            reg = "|".join(rf"\b({re.escape(h)})\b" for h in highlight_list)
+    @core.Cog.listener("on_raw_message_edit")
+    async def highlight_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        content = payload.data.get("content")
+        if content is not None:
+            self.message_buffer.edit(payload.channel_id, payload.message_id, content)
 
-            match = re.search(reg, message.content.lower(), flags=re.IGNORECASE)
-            if not match:
-                continue
+    @core.Cog.listener("on_raw_message_delete")
+    async def highlight_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        self.message_buffer.remove(payload.channel_id, payload.message_id)
 
-            trigger = discord.utils.find(lambda t: t in match.groups(), highlight.triggers)  # type: ignore
-            if not trigger:
-                continue
+    @core.Cog.listener("on_raw_bulk_message_delete")
+    async def highlight_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        for message_id in payload.message_ids:
+            self.message_buffer.remove(payload.channel_id, message_id)
 
-            def check(msg: discord.Message):
-                return msg.author.id == user_id and msg.channel == message.channel
+    @core.Cog.listener("on_guild_channel_delete")
+    async def highlight_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.message_buffer.discard_channel(channel.id)
 
-            try:
-                await self.bot.wait_for("message", check=check, timeout=25)
-            except asyncio.TimeoutError:
-                member = message.guild.get_member(user_id)
-                if not member:
-                    return
+    @core.Cog.listener()
+    async def on_highlights_insert(self, highlight: HighlightsData):
+        self.add_subscriber(highlight.user_id)
 
-                await self.notify_user(message, member, trigger)
+    @core.Cog.listener()
+    async def on_highlights_delete(self, highlight: HighlightsData):
+        self.remove_subscriber(highlight.user_id)
+
+    @core.Cog.listener("on_member_join")
+    async def highlight_member_join(self, member: discord.Member):
+        if member.id in self.raw_highlights:
+            self.guild_subscribers.setdefault(member.guild.id, set()).add(member.id)
+
+    @core.Cog.listener("on_member_remove")
+    async def highlight_member_remove(self, member: discord.Member):
+        subscribers = self.guild_subscribers.get(member.guild.id)
+        if subscribers is None:
+            return
+        subscribers.discard(member.id)
+        if not subscribers:
+            del self.guild_subscribers[member.guild.id]
+
+    @core.Cog.listener("on_guild_join")
+    @core.Cog.listener("on_guild_chunk")
+    async def highlight_guild_join(self, guild: discord.Guild):
+        subscribers = {user_id for user_id in self.raw_highlights if guild.get_member(user_id) is not None}
+        if subscribers:
+            self.guild_subscribers[guild.id] = subscribers
+        else:
+            self.guild_subscribers.pop(guild.id, None)
+
+    @core.Cog.listener("on_guild_remove")
+    async def highlight_guild_remove(self, guild: discord.Guild):
+        self.guild_subscribers.pop(guild.id, None)
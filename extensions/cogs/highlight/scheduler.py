@@ -0,0 +1,154 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Coroutine
+
+if TYPE_CHECKING:
+    import discord
+
+__all__ = (
+    "HighlightScheduler",
+    "PendingHighlight",
+)
+
+_log = logging.getLogger("alpine")
+
+# The notification shows the last highlighted message and the four before it.
+MAX_MESSAGES = 5
+
+
+class PendingHighlight:
+    __slots__ = ("channel_id", "deadline", "guild_id", "messages", "seq", "triggers", "user_id")
+
+    def __init__(self, user_id: int, message: discord.Message, trigger: str, deadline: float, seq: int) -> None:
+        assert message.guild is not None
+        self.user_id: int = user_id
+        self.guild_id: int = message.guild.id
+        self.channel_id: int = message.channel.id
+        self.deadline: float = deadline
+        self.seq: int = seq
+        self.messages: deque[discord.Message] = deque((message,), maxlen=MAX_MESSAGES)
+        self.triggers: list[str] = [trigger]
+
+    def __repr__(self) -> str:
+        return f"<PendingHighlight user_id={self.user_id} channel_id={self.channel_id} messages={len(self.messages)}>"
+
+    def add(self, message: discord.Message, trigger: str) -> None:
+        self.messages.append(message)
+        if trigger not in self.triggers:
+            self.triggers.append(trigger)
+
+
+class HighlightScheduler:
+    """
+    Delays highlight notifications per (user, channel).
+
+    A notification is dropped if the user speaks in the channel before the delay passes,
+    and further triggers in the same channel are merged into the pending notification.
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[PendingHighlight], Coroutine[Any, Any, Any]],
+        *,
+        delay: float = 25,
+    ) -> None:
+        self.callback = callback
+        self.delay: float = delay
+        self._pending: dict[tuple[int, int], PendingHighlight] = {}
+        self._heap: list[tuple[float, int, tuple[int, int]]] = []
+        self._counter = itertools.count()
+        self._wakeup: asyncio.Event = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._callbacks: set[asyncio.Task[None]] = set()
+
+    def __repr__(self) -> str:
+        return f"<HighlightScheduler pending={len(self._pending)}>"
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._pending.clear()
+        self._heap.clear()
+
+    def schedule(self, user_id: int, message: discord.Message, trigger: str) -> PendingHighlight:
+        key = (user_id, message.channel.id)
+        pending = self._pending.get(key)
+        if pending is not None:
+            pending.add(message, trigger)
+            return pending
+
+        seq = next(self._counter)
+        pending = PendingHighlight(user_id, message, trigger, time.monotonic() + self.delay, seq)
+        self._pending[key] = pending
+        heapq.heappush(self._heap, (pending.deadline, seq, key))
+        self._wakeup.set()
+        return pending
+
+    def cancel(self, user_id: int, channel_id: int) -> PendingHighlight | None:
+        # The heap entry is left behind and skipped once it comes due.
+        return self._pending.pop((user_id, channel_id), None)
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            deadline, seq, key = self._heap[0]
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            heapq.heappop(self._heap)
+            pending = self._pending.get(key)
+            if pending is None or pending.seq != seq:
+                continue
+
+            del self._pending[key]
+            task = asyncio.create_task(self._fire(pending))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _fire(self, pending: PendingHighlight) -> None:
+        try:
+            await self.callback(pending)
+        except Exception as exc:
+            _log.error(f"Failed to send highlight notification to {pending.user_id}:", exc_info=exc)
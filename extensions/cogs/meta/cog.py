@@ -163,6 +163,7 @@ class Meta(core.Cog):
                 inline=False,
             )
         else:
+            await self.bot.chunker.request(ctx.guild)
             if ctx.interaction:
                 member = ctx.guild.get_member(member.id) or member
             userroles = ["@everyone"]
@@ -178,14 +179,12 @@ class Meta(core.Cog):
             if member.nick:
                 ie.add_field(name="Nickname", value=member.nick)
 
-            sort = sorted(ctx.guild.members, key=lambda m: getattr(m, "joined_at"))
-            pos = f"{sort.index(member) + 1:,} of {len(ctx.guild.members):,}"
             assert member.joined_at is not None
-            ie.add_field(
-                name="Join Date",
-                value=f"{timestamp(member.joined_at)} ({timestamp(member.joined_at):R})\nJoin Position: {pos}",
-                inline=False,
-            )
+            join_date = f"{timestamp(member.joined_at)} ({timestamp(member.joined_at):R})"
+            sort = sorted(ctx.guild.members, key=lambda m: m.joined_at or dt.datetime.min.replace(tzinfo=dt.timezone.utc))
+            if member in sort:
+                join_date += f"\nJoin Position: {sort.index(member) + 1:,} of {len(sort):,}"
+            ie.add_field(name="Join Date", value=join_date, inline=False)
             ie.add_field(
                 name="Account Creation Date",
                 value=f"{timestamp(member.created_at)} ({timestamp(member.created_at):R})",
@@ -245,6 +244,7 @@ class Meta(core.Cog):
         """
         Show the member count.
         """
+        await self.bot.chunker.request(ctx.guild)
         tmc = len([m for m in ctx.guild.members if not m.bot])
         tbc = len([m for m in ctx.guild.members if m.bot])
         amc = ctx.guild.member_count
@@ -259,6 +259,7 @@ class Meta(core.Cog):
         """
         Show the members in a role.
         """
+        await self.bot.chunker.request(ctx.guild)
         tmc = sum(not m.bot for m in role.members)
         tbc = sum(m.bot for m in role.members)
         mce = discord.Embed(title=f"Members in role: {role}")
@@ -329,7 +330,7 @@ class Meta(core.Cog):
         If the user does not have a timezone set up, an error will occur.
         """
         member = member or ctx.author
-        user = ctx.database.get_user(ctx.author.id)
+        user = await ctx.database.find_user(ctx.author.id)
         if user and user.timezone:
             timezone = zoneinfo.ZoneInfo(user.timezone)
             time = dt.datetime.now(timezone)
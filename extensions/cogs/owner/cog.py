@@ -31,7 +31,7 @@ import traceback
 from difflib import get_close_matches
 from importlib.metadata import distribution, packages_distributions
 from types import TracebackType
-from typing import TYPE_CHECKING, Any, Callable, Deque, Generator
+from typing import TYPE_CHECKING, Any, Callable, Deque, Generator, Literal
 
 import discord
 import psutil
@@ -322,11 +322,12 @@ class Owner(*OPTIONAL_FEATURES, *STANDARD_FEATURES):
             )
             summary.append("")  # blank line
 
+        # Members are chunked on demand, so the user cache only covers chunked guilds.
         guilds = f"{len(self.bot.guilds):,} guilds"
-        humans = f"{sum(not m.bot for m in self.bot.users):,} humans"
-        bots = f"{sum(m.bot for m in self.bot.users):,} bots"
-        users = f"{len(self.bot.users):,} users"
-        cache_summary = f"{guilds} and can see {humans}, and {bots}, totalling to {users}"
+        chunked = f"{sum(guild.chunked for guild in self.bot.guilds):,} chunked"
+        members = f"{self.bot.member_total:,} members"
+        users = f"{len(self.bot.users):,} cached users"
+        cache_summary = f"{guilds} ({chunked}) with {members}, and has {users}"
 
         # Show shard settings to summary
         if isinstance(self.bot, discord.AutoShardedClient):
@@ -363,6 +364,18 @@ class Owner(*OPTIONAL_FEATURES, *STANDARD_FEATURES):
 
         summary.append(f"{message_cache}, {', '.join(group)}, and {last}.")
 
+        command_cache = self.bot.command_cache
+        summary.append(
+            f"Command cache holds {len(command_cache):,}/{command_cache.maxsize:,} responses "
+            f"with a {command_cache.hit_rate:.2%} hit rate."
+        )
+
+        statements = self.bot.database.statements
+        summary.append(
+            f"Database cache builds {statements.statements:,} distinct update queries, "
+            f"looked up {statements.lookups:,} times and run for {statements.executed:,} rows."
+        )
+
         # Show websocket latency in milliseconds
         summary.append(f"Average websocket latency: `{round(self.bot.latency * 1000, 2)}ms`")
 
@@ -492,6 +505,170 @@ class Owner(*OPTIONAL_FEATURES, *STANDARD_FEATURES):
         interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
         return await interface.send_to(ctx)
 
+    @Feature.Command(parent="jsk", name="pool", aliases=["dbstats"])
+    async def jsk_pool(self, ctx: Context):
+        """
+        Shows database pool usage, query latency and recent slow queries.
+        """
+        pool = ctx.database.pool
+        wait = pool.acquire_wait
+
+        paginator = commands.Paginator(max_size=1985, prefix="", suffix="")
+        paginator.add_line(
+            f"**Connections:** {pool.size}/{pool.max_size} open, {pool.in_use} in use, "
+            f"{pool.idle} idle, {pool.waiting} waiting"
+        )
+        paginator.add_line(
+            f"**Acquire wait:** p50 `{wait.percentile(50) * 1000:.1f}ms`, p95 `{wait.percentile(95) * 1000:.1f}ms`, "
+            f"p99 `{wait.percentile(99) * 1000:.1f}ms`, max `{wait.max * 1000:.1f}ms` over {wait.count:,} acquires"
+        )
+
+        paginator.add_line("")
+        paginator.add_line("**Statements by total time:**")
+        statements = sorted(pool.statements.items(), key=lambda item: item[1].total, reverse=True)
+        for query, histogram in statements[:15]:
+            paginator.add_line(
+                f"`{histogram.total:.2f}s` {histogram.count:,}x, p50 `{histogram.percentile(50) * 1000:.1f}ms`, "
+                f"p95 `{histogram.percentile(95) * 1000:.1f}ms`: `{query[:100]}`"
+            )
+
+        if pool.slow_queries:
+            paginator.add_line("")
+            paginator.add_line(f"**Slow queries (over {pool.slow_query * 1000:.0f}ms):**")
+            for slow in reversed(pool.slow_queries):
+                paginator.add_line(
+                    f"{timestamp(slow.when):R} `{slow.elapsed * 1000:.0f}ms` from `{slow.call_site}`: `{slow.query[:100]}`"
+                )
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        return await interface.send_to(ctx)
+
+    @Feature.Command(parent="jsk", name="loop", aliases=["lag", "stalls"])
+    async def jsk_loop(self, ctx: Context):
+        """
+        Shows event loop lag and the handlers that recently blocked the loop.
+        """
+        monitor = self.bot.loop_monitor
+        histogram = monitor.histogram
+
+        paginator = commands.Paginator(max_size=1985, prefix="", suffix="")
+        paginator.add_line(
+            f"**Current lag:** `{monitor.lag * 1000:.1f}ms`, threshold `{monitor.threshold * 1000:.0f}ms`, "
+            f"{monitor.stall_count:,} stalls since startup"
+        )
+        paginator.add_line(
+            f"**Recent:** p50 `{monitor.percentile(50) * 1000:.1f}ms`, p95 `{monitor.percentile(95) * 1000:.1f}ms`, "
+            f"p99 `{monitor.percentile(99) * 1000:.1f}ms` over {len(monitor.recent):,} samples"
+        )
+        paginator.add_line(
+            f"**All time:** p99 `{histogram.percentile(99) * 1000:.1f}ms`, max `{histogram.max * 1000:.1f}ms` "
+            f"over {histogram.count:,} samples"
+        )
+
+        for stall in reversed(monitor.stalls):
+            paginator.add_line("")
+            paginator.add_line(f"{timestamp(stall.when):R} blocked `{stall.duration * 1000:.0f}ms` by **{stall.source}**")
+            paginator.add_line(f"```py\n{stall.stack[-1500:]}```")
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        return await interface.send_to(ctx)
+
+    @Feature.Command(parent="jsk", name="messages", aliases=["msgcache"])
+    async def jsk_messages(self, ctx: Context):
+        """
+        Shows message cache budgets and the guilds using the most of it.
+        """
+        store = self.bot._connection.message_store
+        if store is None:
+            return await ctx.send("The message cache is disabled.")
+
+        paginator = commands.Paginator(max_size=1985, prefix="", suffix="")
+        paginator.add_line(
+            f"**Cached:** {len(store):,}/{store.max_messages:,} messages in {len(store.usage()):,} guilds, "
+            f"about {store.memory / 1024 / 1024:.1f} MiB"
+        )
+        paginator.add_line(f"**Budget:** {store.per_guild:,} messages per guild")
+        paginator.add_line("")
+        for guild_id, count, memory in store.usage(25):
+            guild = self.bot.get_guild(guild_id) if guild_id else None
+            name = guild.name if guild else "Direct messages" if guild_id is None else guild_id
+            paginator.add_line(f"**{name}**: {count:,} messages, {memory / 1024:.0f} KiB")
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        return await interface.send_to(ctx)
+
+    @Feature.Command(parent="jsk", name="webhooks", aliases=["logqueue"])
+    async def jsk_webhooks(self, ctx: Context):
+        """
+        Shows logging webhook queue depth, delivery and drop counters.
+        """
+        stats = self.bot.webhooks.stats()
+
+        paginator = commands.Paginator(max_size=1985, prefix="", suffix="")
+        paginator.add_line(f"**Queued:** {stats['queued']:,} entries across {stats['destinations']:,} webhooks")
+        paginator.add_line(
+            f"**Sent:** {stats['entries_sent']:,} entries in {stats['messages_sent']:,} messages, "
+            f"{stats['retries']:,} retries, {stats['dropped']:,} dropped"
+        )
+
+        busiest = self.bot.webhooks.busiest()
+        if busiest:
+            paginator.add_line("")
+            paginator.add_line("**Deepest queues:**")
+            for webhook_id, depth, dropped in busiest:
+                paginator.add_line(f"`{webhook_id}`: {depth:,} queued, {dropped:,} dropped")
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        return await interface.send_to(ctx)
+
+    @Feature.Command(parent="jsk", name="profile", aliases=["timings"])
+    async def jsk_profile(self, ctx: Context, kind: Literal["commands", "listeners", "reset"] | None = None):
+        """
+        Shows the slowest commands and listeners by p95 latency.
+
+        Command phases are shown as `name (checks)` and `name (converters)`.
+        """
+        if kind == "reset":
+            self.bot.command_timings.clear()
+            self.bot.listener_timings.clear()
+            return await ctx.send("Cleared command and listener timings.")
+
+        trackers = {"commands": self.bot.command_timings, "listeners": self.bot.listener_timings}
+        if kind is not None:
+            trackers = {kind: trackers[kind]}
+
+        paginator = commands.Paginator(max_size=1985, prefix="", suffix="")
+        for title, tracker in trackers.items():
+            paginator.add_line(f"**Slowest {title} (rolling p95):**")
+            top = tracker.top(20)
+            if not top:
+                paginator.add_line("Nothing recorded yet.")
+            for name, stats in top:
+                paginator.add_line(
+                    f"`{name}` {stats.count:,}x, p50 `{stats.percentile(50) * 1000:.1f}ms`, "
+                    f"p95 `{stats.percentile(95) * 1000:.1f}ms`, p99 `{stats.percentile(99) * 1000:.1f}ms`, "
+                    f"max `{stats.max * 1000:.1f}ms`"
+                )
+            paginator.add_line("")
+
+        interface = PaginatorInterface(ctx.bot, paginator, owner=ctx.author)
+        return await interface.send_to(ctx)
+
+    @Feature.Command(parent="jsk", name="usage")
+    async def jsk_usage(self, ctx: Context, days: int = 7, guild_id: int | None = None):
+        """
+        Shows the most used commands over the last few days, optionally in one server.
+        """
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+        top = await ctx.database.usage.top_commands(since, guild_id=guild_id, limit=25)
+        if not top:
+            return await ctx.send("No commands have been used in that time.")
+
+        where = f" in {guild_id}" if guild_id else ""
+        lines = [f"`{uses:,}` {command}" for command, uses in top]
+        embed = discord.Embed(title=f"Top commands over {days} days{where}", description="\n".join(lines))
+        return await ctx.send(embed=embed)
+
     @Feature.Command(parent="jsk")
     async def news(self, ctx: Context, *, news: str):
         """
@@ -503,7 +680,7 @@ class Owner(*OPTIONAL_FEATURES, *STANDARD_FEATURES):
             news_file.seek(0)
             news_file.truncate()
             toml.dump(load, news_file)
-            self.bot.news = news
+        self.bot.reload_settings()
         embed = discord.Embed(title="Successfully Set News.", description=f"Here is the preview.\n{news}")
         await ctx.send(embed=embed)
 
@@ -112,10 +112,10 @@ class Settings(core.GroupCog, group_name="settings"):
         This color will be used for embeds sent by the bot.
         """
 
-        user_data = await ctx.database.get_or_fetch_user(ctx.author.id)
         embed = discord.Embed(description="Does this look good?", color=color)
         conf = await ctx.confirm(embed=embed)
         if conf.result:
+            user_data = await ctx.database.get_or_fetch_user(ctx.author.id)
             await user_data.update(color=color.value)
             return await conf.message.edit(content=f"Set theme to {color}", embed=None)
         return await conf.message.edit(content="Okay, nevermind.", embed=None)
@@ -126,7 +126,7 @@ class Settings(core.GroupCog, group_name="settings"):
 
         This will remove the color used for embeds and will use your top role color instead.
         """
-        user_data = ctx.database.get_user(ctx.author.id)
+        user_data = await ctx.database.find_user(ctx.author.id)
         if not user_data:
             return await ctx.send("You do not have a theme set.")
         conf = await ctx.confirm(message="Are you sure you want to remove your theme?")
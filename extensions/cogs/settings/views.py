@@ -223,7 +223,7 @@ class PrefixAddModal(ui.Modal, title="Add a prefix"):
             return
 
         prefixes.append(prefix)
-        await self.container.data.update(prefixes=prefixes)
+        await self.container.data.update(prefixes=prefixes, defer=True)
         self.container.update()
         await itn.response.edit_message(view=self.container.view)
         return
@@ -240,7 +240,7 @@ class PrefixRemoveSelect(ui.Select[SettingsView]):
 
         for prefix in self.values:
             container.data.prefixes.remove(prefix)
-        await container.data.update(prefixes=container.data.prefixes)
+        await container.data.update(prefixes=container.data.prefixes, defer=True)
 
         container.update()
         await itn.response.edit_message(view=self.view)
@@ -407,7 +407,7 @@ class LoggingTypesSelect(ui.Select[SettingsView]):
             return
 
         for option in self.options:
-            default = bool(logging._data.get(option.value))
+            default = bool(getattr(logging, option.value, False))
             option.default = default
 
     async def callback(self, itn: Interaction):
@@ -419,7 +419,7 @@ class LoggingTypesSelect(ui.Select[SettingsView]):
 
         changed = LOGGING_DEFAULTS.copy()
         changed.update(dict.fromkeys(values, True))
-        await logging.update(**changed)  # type: ignore
+        await logging.update(**changed, defer=True)  # type: ignore
         self.update()
         await itn.response.send_message("Successfully updated log list.", ephemeral=True)
 
@@ -434,7 +434,7 @@ class LoggingToggleButton(ui.Button[SettingsView]):
             logging = await self.view.container.data.insert_logging()
 
         state = logging.enabled
-        await logging.update(enabled=not state)
+        await logging.update(enabled=not state, defer=True)
         self.view.container.update()
         await itn.response.edit_message(view=self.view)
 
@@ -639,7 +639,7 @@ class JLToggleButton(ui.Button[SettingsView]):
 
         state = join_leave.enabled
 
-        await join_leave.update(enabled=not state)
+        await join_leave.update(enabled=not state, defer=True)
         self.view.container.update()
         await itn.response.edit_message(view=self.view)
 
@@ -798,7 +798,7 @@ class VerificationToggle(ui.Button[SettingsView]):
             verification = await self.view.container.data.insert_verification()
 
         state = verification.high
-        await verification.update(high=not state)
+        await verification.update(high=not state, defer=True)
         self.view.container.update()
         await itn.response.edit_message(view=self.view)
 
@@ -0,0 +1,160 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from aiohttp import web
+
+import core
+from utils import Histogram, MetricsWriter
+
+if TYPE_CHECKING:
+    from discord.http import Route
+
+    from core import Bot
+
+_log = logging.getLogger("alpine")
+
+MAX_ROUTES = 200
+
+
+class Metrics(core.Cog):
+    """
+    Serves process metrics for Prometheus at /metrics.
+    """
+
+    def __init__(self, bot: Bot) -> None:
+        super().__init__(bot)
+        options = self.bot.settings.get("metrics", {})
+        self.host: str = options.get("host", "127.0.0.1")
+        self.port: int = options.get("port", 9100)
+        self.http_requests: dict[str, Histogram] = {}
+        self._runner: web.AppRunner | None = None
+
+    async def cog_load(self) -> None:
+        self._patch_http()
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError:
+            _log.exception(f"Could not serve metrics on {self.host}:{self.port}")
+
+    async def cog_unload(self) -> None:
+        vars(self.bot.http).pop("request", None)
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def _patch_http(self) -> None:
+        # Timing the whole request includes waiting on rate limits and retries, not just the network.
+        original = self.bot.http.request
+
+        async def request(route: Route, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await original(route, **kwargs)
+            finally:
+                self.record_http(route, time.perf_counter() - start)
+
+        self.bot.http.request = request  # type: ignore
+
+    def record_http(self, route: Route, elapsed: float) -> None:
+        key = f"{route.method} {route.path}"
+        histogram = self.http_requests.get(key)
+        if histogram is None:
+            if len(self.http_requests) >= MAX_ROUTES:
+                key = "<other>"
+                histogram = self.http_requests.get(key)
+            if histogram is None:
+                histogram = self.http_requests[key] = Histogram()
+        histogram.observe(elapsed)
+
+    def collect(self) -> str:
+        bot = self.bot
+        writer = MetricsWriter()
+
+        writer.counter("commands_total", "Commands run, by command.", bot.command_usage, label="command")
+        writer.counter("gateway_events_total", "Gateway events received, by type.", bot.gateway_events, label="event")
+        writer.gauge("event_loop_lag_seconds", "Most recent event loop lag.", bot.loop_monitor.lag)
+        writer.histogram("event_loop_lag_distribution_seconds", "Event loop lag samples.", bot.loop_monitor.histogram)
+        writer.counter("event_loop_stalls_total", "Times the event loop was blocked too long.", bot.loop_monitor.stall_count)
+        writer.gauge("gateway_latency_seconds", "Gateway heartbeat latency.", bot.latency)
+        writer.gauge("guilds", "Guilds the bot is in.", len(bot.guilds))
+        writer.gauge("voice_players", "Connected voice players.", len(bot.voice_clients))
+
+        writer.gauge("command_cache_size", "Cached command responses.", len(bot.command_cache))
+        writer.gauge("command_cache_hit_ratio", "Command response cache hit rate.", bot.command_cache.hit_rate)
+        writer.histogram(
+            "http_request_seconds",
+            "Discord HTTP request time by route, including rate limit waits.",
+            self.http_requests,
+            label="route",
+        )
+
+        webhooks = bot.webhooks.stats()
+        writer.gauge("log_webhook_queued", "Logging entries waiting to be sent.", webhooks["queued"])
+        writer.counter("log_webhook_messages_total", "Logging webhook messages sent.", webhooks["messages_sent"])
+        writer.counter("log_webhook_entries_total", "Logging entries delivered.", webhooks["entries_sent"])
+        writer.counter("log_webhook_retries_total", "Logging webhook sends retried.", webhooks["retries"])
+        writer.counter("log_webhook_dropped_total", "Logging entries dropped.", webhooks["dropped"])
+
+        chunker = bot.chunker
+        writer.gauge("chunk_pending", "Guilds waiting to be chunked.", chunker.pending)
+        writer.counter("chunk_total", "Guilds chunked since startup.", chunker.chunked)
+        writer.counter("chunk_seconds_total", "Time spent chunking guilds.", chunker.chunk_time)
+        writer.counter("chunk_evictions_total", "Idle guilds whose member cache was dropped.", chunker.evicted)
+        writer.gauge("cached_members", "Members in the member cache.", sum(len(guild._members) for guild in bot.guilds))
+
+        store = bot._connection.message_store
+        if store is not None:
+            writer.gauge("message_cache", "Messages in the bot's message cache.", len(store))
+            writer.gauge("message_cache_bytes", "Estimated memory used by the message cache.", store.memory)
+
+        logs = bot.get_cog("BotLogs")
+        if logs is not None:
+            writer.gauge("log_message_cache", "Messages cached for delete and edit logging.", len(logs.message_cache))
+
+        database = getattr(bot, "database", None)
+        if database is not None:
+            writer.gauge("database_cache_rows", "Cached database rows, by table.", database.cache_sizes(), label="table")
+            pool = getattr(database, "pool", None)
+            if pool is not None:
+                writer.gauge(
+                    "database_connections",
+                    "Database pool connections, by state.",
+                    {"in_use": pool.in_use, "idle": pool.idle},
+                    label="state",
+                )
+                writer.gauge("database_waiting", "Tasks waiting for a database connection.", pool.waiting)
+                writer.histogram("database_acquire_seconds", "Time spent waiting for a connection.", pool.acquire_wait)
+
+        return writer.render()
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.collect(), content_type="text/plain", charset="utf-8")
+
+
+async def setup(bot: Bot) -> None:
+    await bot.add_cog(Metrics(bot))
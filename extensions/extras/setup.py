@@ -42,19 +42,18 @@ class Setup(core.Cog):
 
     @core.Cog.listener()
     async def on_message(self, message: discord.Message):
-        ctx = await self.bot.get_context(message)
-        if await self.bot.is_owner(ctx.author) and ctx.valid:
-            return
         if message.author.bot:
             return
+        if await self.bot.is_owner(message.author) and (await self.bot.get_command_info(message)).valid:
+            return
         if isinstance(message.channel, discord.DMChannel):
-            user_data = await ctx.database.get_or_fetch_user(ctx.author.id)
+            user_data = await self.bot.database.get_or_fetch_user(message.author.id)
             if not user_data.dmed:
                 await message.channel.send(
                     "Hello. Please note that messages sent through DM are logged, "
                     "and can be used as a way to send a message to the developers."
                 )
-                await user_data.update(dmed=True)
+                await user_data.update(dmed=True, defer=True)
             embed = discord.Embed(title=f"DM from {message.author}", description=message.content)
             embed.set_footer(text=message.author.id)
             ts = message.created_at.timestamp()
@@ -66,8 +65,9 @@ class Setup(core.Cog):
         try:
             if message.channel.id == 945187311509962782:
                 resolved = None
-                if ctx.reference is not None:
-                    resolved = ctx.reference.embeds[0]
+                reference = message.reference.resolved if message.reference else None
+                if isinstance(reference, discord.Message):
+                    resolved = reference.embeds[0]
                 if resolved and resolved.footer.text and resolved.footer.text.isdigit():
                     user = self.bot.get_user(int(resolved.footer.text))
                     if user:
@@ -84,6 +84,7 @@ class Setup(core.Cog):
     async def on_guild_join(self, guild: discord.Guild):
         if self.bot.user.id != 756257170521063444:
             return
+        await self.bot.chunker.request(guild)
         members = sum(not m.bot for m in guild.members)
         bots = sum(m.bot for m in guild.members)
         summary = [
@@ -99,8 +100,6 @@ class Setup(core.Cog):
         if guild.icon:
             embed.set_thumbnail(url=guild.icon.url)
         await self.guild_webhook.send(embed=embed, username="Joined Guild")
-        if not guild.chunked:
-            await guild.chunk()
         embed = discord.Embed(
             title="\U0001f44b Hey, I am Alpine!",
             description="Hello, thank you for adding me to your server. Here are some commands to get you started.",
@@ -139,12 +138,10 @@ class Setup(core.Cog):
     async def on_command(self, ctx: Context):
         if not ctx.guild:
             return
-        try:
-            self.bot.command_usage[str(ctx.command)] += 1
-        except KeyError:
-            self.bot.command_usage[str(ctx.command)] = 1
-        if not ctx.guild.chunked:
-            await ctx.guild.chunk()
+        name = ctx.command.qualified_name
+        self.bot.command_usage[name] = self.bot.command_usage.get(name, 0) + 1
+        self.bot.database.usage.record(name, ctx.guild.id, ctx.message.created_at)
+        self.bot.chunker.schedule(ctx.guild)
         self.bot.commands_ran += 1
 
 
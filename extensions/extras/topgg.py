@@ -47,7 +47,7 @@ class TopGG(core.Cog):
         headers = {"Authorization": self.bot.api["DBL"]}
         data = {
             "voice_connections": len(self.bot.voice_clients),
-            "users": len(self.bot.users),
+            "users": self.bot.member_total,
             "guilds": len(self.bot.guilds),
         }
         await self.bot.session.post(
@@ -66,7 +66,7 @@ class TopGG(core.Cog):
             return
         activities = [
             f"In {len(self.bot.guilds)} Servers",
-            f"Looking at {len(self.bot.users)} Users",
+            f"Looking at {self.bot.member_total:,} Members",
             f"Made by @{self.bot.get_user(750135653638865017)}",
         ]
         await self.bot.change_presence(
@@ -16,10 +16,15 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from __future__ import annotations
+
+import asyncio
+import contextlib
 import datetime
 import logging
 import re
 import traceback as tb
+from typing import Any, Coroutine
 
 import discord
 import humanize
@@ -49,7 +54,14 @@ from mystbin import File as MystFile
 
 import core
 from core import Bot, Context
-from core.exceptions import Blacklisted, CommandDisabledChannel, CommandDisabledGuild, Maintenance, NotGuildOwner
+from core.exceptions import (
+    Blacklisted,
+    CommandDisabledChannel,
+    CommandDisabledGuild,
+    DatabaseNotReady,
+    Maintenance,
+    NotGuildOwner,
+)
 from utils import format_list
 
 _log = logging.getLogger("alpine")
@@ -104,6 +116,173 @@ class ErrorTrackerButton(discord.ui.DynamicItem[discord.ui.Button[discord.ui.Vie
         return None
 
 
+# (command, error)
+ErrorKey = tuple[str, str]
+
+
+class _ErrorDigest:
+    __slots__ = ("count", "details", "new", "traceback")
+
+    def __init__(self, traceback: str, details: str, new: bool) -> None:
+        self.traceback: str = traceback
+        self.details: str = details
+        self.new: bool = new
+        self.count: int = 1
+
+
+class ErrorReporter:
+    """
+    Keeps an index of logged command errors, inserts new ones in batches and reports them in digests.
+
+    Nothing here needs to be awaited before replying to the user.
+    """
+
+    insert_query = """
+                   INSERT INTO command_errors (command, error)
+                   SELECT * FROM UNNEST($1::TEXT[], $2::TEXT[])
+                   RETURNING id, command, error
+                   """
+
+    def __init__(
+        self, bot: Bot, webhook: discord.Webhook, *, insert_interval: float = 2.0, digest_interval: float = 30.0
+    ) -> None:
+        self.bot: Bot = bot
+        self.webhook: discord.Webhook = webhook
+        self.insert_interval: float = insert_interval
+        self.digest_interval: float = digest_interval
+        self.known: dict[ErrorKey, int] = {}
+        self._pending: dict[ErrorKey, asyncio.Future[int]] = {}
+        self._digests: dict[ErrorKey, _ErrorDigest] = {}
+        self._loaded: asyncio.Event = asyncio.Event()
+        self._insert_task: asyncio.Task[None] | None = None
+        self._digest_task: asyncio.Task[None] | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+
+    def spawn(self, coro: Coroutine[Any, Any, Any]) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def load(self) -> None:
+        try:
+            await self.bot.database.wait_until_ready()
+            records = await self.bot.database.pool.fetch("SELECT id, command, error FROM command_errors ORDER BY id")
+        except Exception:
+            _log.exception("Failed to load known command errors, repeated errors may get new IDs")
+        else:
+            for record in records:
+                self.known.setdefault((record["command"], record["error"]), record["id"])
+        finally:
+            # Inserts wait for this, so it is set even if loading failed or was cancelled.
+            self._loaded.set()
+
+    def get(self, key: ErrorKey) -> int | None:
+        return self.known.get(key)
+
+    def insert(self, key: ErrorKey) -> asyncio.Future[int]:
+        """
+        Returns a future for the error's ID, inserting it with the next batch if it is new.
+        """
+        future = self._pending.get(key)
+        if future is not None:
+            return future
+
+        future = asyncio.get_running_loop().create_future()
+        error_id = self.known.get(key)
+        if error_id is not None:
+            future.set_result(error_id)
+            return future
+
+        self._pending[key] = future
+        if self._insert_task is None or self._insert_task.done():
+            self._insert_task = asyncio.create_task(self._insert_later())
+        return future
+
+    async def _insert_later(self) -> None:
+        await asyncio.sleep(self.insert_interval)
+        # Shielded so closing the cog does not drop a batch that is being written.
+        await asyncio.shield(self.flush_inserts())
+
+    async def flush_inserts(self) -> None:
+        await self._loaded.wait()
+        pending, self._pending = self._pending, {}
+
+        new: list[ErrorKey] = []
+        for key, future in pending.items():
+            # Errors reported before the index finished loading may already have a row.
+            error_id = self.known.get(key)
+            if error_id is not None:
+                future.set_result(error_id)
+            else:
+                new.append(key)
+        if not new:
+            return
+
+        try:
+            records = await self.bot.database.pool.fetch(
+                self.insert_query, [command for command, _ in new], [error for _, error in new]
+            )
+        except Exception as exc:
+            _log.exception(f"Failed to log {len(new)} command errors")
+            for key in new:
+                pending[key].set_exception(exc)
+                # Retrieve the exception so a reply that stopped waiting does not log it again.
+                pending[key].exception()
+            return
+
+        for record in records:
+            key = (record["command"], record["error"])
+            self.known[key] = record["id"]
+            pending[key].set_result(record["id"])
+
+    def record(self, key: ErrorKey, traceback: str, details: str) -> None:
+        """
+        Adds an occurrence of an error to the next digest.
+        """
+        digest = self._digests.get(key)
+        if digest is None:
+            self._digests[key] = _ErrorDigest(traceback, details, key not in self.known)
+        else:
+            digest.count += 1
+
+        if self._digest_task is None or self._digest_task.done():
+            self._digest_task = asyncio.create_task(self._digest_later())
+
+    async def _digest_later(self) -> None:
+        await asyncio.sleep(self.digest_interval)
+        await asyncio.shield(self.send_digests())
+
+    async def send_digests(self) -> None:
+        digests, self._digests = self._digests, {}
+        for key, digest in digests.items():
+            error_id: int | str = self.known.get(key) or "unknown"
+            future = self._pending.get(key)
+            if future is not None:
+                with contextlib.suppress(Exception):
+                    error_id = await future
+
+            traceback = digest.traceback
+            try:
+                if len(traceback) > 1995:
+                    paste_file: MystFile = MystFile(filename="error.py", content=traceback)
+                    traceback = f"Error was too long: {await self.bot.myst.create_paste(files=[paste_file])}"
+
+                times = f" ({digest.count} times)" if digest.count > 1 else ""
+                embed = Embed(title=f"{'A new error' if digest.new else 'Old error'}{times}")
+                embed.description = f"{digest.details}\nError ID: {error_id}"
+                await self.webhook.send(traceback, embed=embed, username="Command Error")
+            except Exception:
+                _log.exception(f"Failed to report error {error_id}")
+
+    async def close(self) -> None:
+        for task in (self._insert_task, self._digest_task):
+            if task is not None and not task.done():
+                task.cancel()
+        if self._loaded.is_set():
+            await self.flush_inserts()
+        await self.send_digests()
+
+
 class ErrorHandler(core.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
@@ -114,15 +293,18 @@ class ErrorHandler(core.Cog):
             self.bot.settings["webhooks"]["error_log"],
             session=self.bot.session,
         )
+        self.reporter = ErrorReporter(self.bot, self.error_webhook)
         self._original_tree_error = self.bot.tree.on_error
 
-    def cog_load(self):
+    async def cog_load(self):
         self.bot.add_dynamic_items(ErrorTrackerButton)
         self.bot.tree.on_error = self.on_tree_error
+        self.reporter.spawn(self.reporter.load())
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self.bot.tree.on_error = self._original_tree_error
         self.bot.remove_dynamic_items(ErrorTrackerButton)
+        await self.reporter.close()
 
     def reset(self, ctx: Context):
         try:
@@ -130,6 +312,37 @@ class ErrorHandler(core.Cog):
         except Exception:
             pass
 
+    def error_embed(self, ctx: Context, error: Exception, error_id: int | None, *, known: bool) -> discord.Embed:
+        embed = discord.Embed()
+        if known:
+            embed.title = "A known error occured"
+            lines = ["This error was already logged, but has not been fixed."]
+        else:
+            embed.title = "An unknown error occured"
+            lines = ["This error has been logged and will be fixed soon."]
+        if error_id is not None:
+            lines.append(f"You can track this error with the button below, or use `{ctx.prefix}error {error_id}`.")
+        embed.description = "\n".join(lines) + f"\n\nError Information:```py\n{error}```"
+        return embed
+
+    def error_view(self, error_id: int | None) -> discord.ui.View:
+        view = discord.ui.View(timeout=None)
+        if error_id is not None:
+            view.add_item(ErrorTrackerButton(error_id))
+        view.add_item(discord.ui.Button(style=discord.ButtonStyle.link, label="Support Server", url=self.bot.support))
+        return view
+
+    async def add_error_id(
+        self, ctx: Context, message: discord.Message, error: Exception, future: asyncio.Future[int]
+    ) -> None:
+        try:
+            error_id = await future
+        except Exception:
+            return
+        embed = self.error_embed(ctx, error, error_id, known=False)
+        with contextlib.suppress(discord.HTTPException):
+            await message.edit(embed=embed, view=self.error_view(error_id))
+
     def get_cooldown(self, command: commands.Command):
         cooldown = command.cooldown
         if cooldown:
@@ -260,6 +473,9 @@ class ErrorHandler(core.Cog):
         elif isinstance(error, NotGuildOwner):
             return await ctx.send("You do not own the server.", ephemeral=True)
 
+        elif isinstance(error, DatabaseNotReady):
+            return await ctx.send("Alpine is still starting up. Try again in a moment.", ephemeral=True)
+
         elif isinstance(error, MissingRequiredArgument):
             self.reset(ctx)
             a = Embed(
@@ -328,57 +544,31 @@ class ErrorHandler(core.Cog):
 
         else:
             self.reset(ctx)
-            exc = tb.format_exception(type(error), error, error.__traceback__)
-            traceback = f"```{''.join(exc)}```"
-            if len(traceback) > 1995:
-                paste_file: MystFile = MystFile(filename="error.py", content=traceback)
-                traceback = f"Error was too long: {await self.bot.myst.create_paste(files=[paste_file])}"
-
             if self.bot.user.id != 756257170521063444:
                 await ctx.send(ctx.codeblock(str(error)))
             else:
-                query = "SELECT * FROM command_errors WHERE command=$1 and error=$2"
-                in_db = await self.bot.database.pool.fetchrow(query, ctx.command.qualified_name, str(error))
-                embed = discord.Embed()
-                if not in_db:
-                    insert_query = "INSERT INTO command_errors (command, error) VALUES ($1, $2) RETURNING *"
-                    inserted_error = await self.bot.database.pool.fetchrow(
-                        insert_query, ctx.command.qualified_name, str(error)
-                    )
-                    assert inserted_error is not None
-                    embed.title = "An unknown error occured"
-                    embed.description = (
-                        "This error has been logged and will be fixed soon.\n"
-                        "You can track this error with the button below, or use "
-                        f"`{ctx.prefix}error {inserted_error['id']}`.\n\n"
-                        f"Error Information:```py\n{error}```"
-                    )
-                    in_db = inserted_error
-                elif in_db["error"] == str(error):
-                    embed.title = "A known error occured"
-                    embed.description = (
-                        "This error was already logged, but has not been fixed.\n"
-                        "You can track this error with the button below, or use "
-                        f"`{ctx.prefix}error {in_db['id']}`.\n\n"
-                        f"Error Information:```py\n{error}```"
-                    )
-
-                webhook_error_embed = Embed(title="Old error" if in_db["error"] == str(error) else "A new error")
-                webhook_error_embed.description = (
+                exc = tb.format_exception(type(error), error, error.__traceback__)
+                key = (ctx.command.qualified_name, str(error))
+                error_id = self.reporter.get(key)
+                self.reporter.record(
+                    key,
+                    f"```{''.join(exc)}```",
                     f"Guild: {ctx.guild.name} ({ctx.guild.id})\n"
                     f"Channel: {ctx.channel} ({ctx.channel.id})\n"
                     f"Command: {ctx.command.qualified_name}\n"
                     f"Message: {ctx.message.content}\n"
-                    f"Invoker: {ctx.author}\n"
-                    f"Error ID: {in_db['id']}"
+                    f"Invoker: {ctx.author}",
                 )
-                await self.error_webhook.send(traceback, embed=webhook_error_embed, username="Command Error")
-                view = discord.ui.View(timeout=None)
-                view.add_item(ErrorTrackerButton(in_db["id"]))
-                view.add_item(
-                    discord.ui.Button(style=discord.ButtonStyle.link, label="Support Server", url=self.bot.support)
-                )
-                await ctx.send(embed=embed, view=view, ephemeral=True)
+
+                if error_id is not None:
+                    embed = self.error_embed(ctx, error, error_id, known=True)
+                    await ctx.send(embed=embed, view=self.error_view(error_id), ephemeral=True)
+                else:
+                    # The ID is added once the error has been inserted with the next batch.
+                    future = self.reporter.insert(key)
+                    embed = self.error_embed(ctx, error, None, known=False)
+                    message = await ctx.send(embed=embed, view=self.error_view(None), ephemeral=True)
+                    self.reporter.spawn(self.add_error_id(ctx, message, error, future))
             _log.error(f"Ignoring exception in command {ctx.command}:", exc_info=error)
             return None
 
@@ -16,19 +16,19 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import contextlib
+import asyncio
 import datetime as dt
 from io import BytesIO
 
 import discord
 from discord import ui
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord.utils import escape_markdown
 
 import core
 from core import Bot, Context
-from core.exceptions import Blacklisted, CommandDisabledChannel, CommandDisabledGuild, Maintenance
-from utils import format_seconds, timestamp
+from core.exceptions import Blacklisted, CommandDisabledChannel, CommandDisabledGuild, DatabaseNotReady, Maintenance
+from utils import LoggedMessage, LoggingData, MessageLogCache, format_seconds, timestamp
 
 TOKEN_REGEX = r"([a-zA-Z0-9]{24}\.[a-zA-Z0-9]{6}\.[a-zA-Z0-9_\-]{27}|mfa\.[a-zA-Z0-9_\-]{84})"
 
@@ -43,128 +43,186 @@ EDIT_MAPPING = {
 
 TOGGLE_MAPPING = {True: "On", False: "Off"}
 
-NO_MENTIONS = discord.AllowedMentions.none()
-
 
 def ordinal(num: int):
     suffix = "th" if 11 <= num % 100 <= 13 else ["th", "st", "nd", "rd", "th"][min(num % 10, 4)]
     return f"{num:,}{suffix}"
 
 
+class BulkDeleteLog:
+    """
+    Formats bulk deleted messages in a single pass.
+
+    Lines are kept inline until they would exceed ``limit`` characters, after which
+    everything is written to an in-memory file instead.
+    """
+
+    __slots__ = ("buffer", "count", "length", "limit", "lines")
+
+    SEPARATOR = b"\n\n----------\n\n"
+
+    def __init__(self, limit: int = 3800) -> None:
+        self.limit: int = limit
+        self.count: int = 0
+        self.length: int = 0
+        self.lines: list[str] = []
+        self.buffer: BytesIO | None = None
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+    def add(self, message: LoggedMessage, author: str) -> None:
+        content = message.content
+        if len(content) > 100:
+            content = f"{content[:100]}..."
+        line = f"[{timestamp(message.created_at):t}] {author}: {escape_markdown(content) or '*No content*'}"
+        self.count += 1
+
+        if self.buffer is None:
+            self.length += len(line) + bool(self.lines)
+            if self.length <= self.limit:
+                self.lines.append(line)
+                return
+            self.buffer = BytesIO()
+            self.buffer.write(self.SEPARATOR.join(entry.encode() for entry in self.lines))
+            self.lines.clear()
+
+        if self.buffer.tell():
+            self.buffer.write(self.SEPARATOR)
+        self.buffer.write(line.encode())
+
+    def to_file(self, filename: str) -> discord.File | None:
+        if self.buffer is None:
+            return None
+        self.buffer.seek(0)
+        return discord.File(self.buffer, filename=filename)
+
+
 class BotLogs(core.Cog):
     def __init__(self, bot: Bot):
         self.bot = bot
         self.load_time = dt.datetime.now(dt.timezone.utc)
-        self.clear_cache.start()
+        options = bot.settings.get("logging", {})
+        self.message_cache: MessageLogCache = MessageLogCache(per_guild=options.get("message_cache_per_guild", 1000))
 
-    @core.Cog.listener("on_message_delete")
-    @core.Cog.listener("on_bulk_message_delete")
-    async def logging_delete(self, message: discord.Message | list[discord.Message]):
-        msg = message[0] if isinstance(message, list) else message
-        if msg.guild is None:
-            return
-        settings = self.bot.database.get_guild(msg.guild.id)
+    def get_logging(self, guild_id: int) -> LoggingData | None:
+        settings = self.bot.database.get_guild(guild_id)
         logging = settings.logging if settings else None
-        if not logging or not logging.enabled or not logging.message_delete or not logging.webhook:
+        if not logging or not logging.enabled or not logging.webhook:
+            return None
+        return logging
+
+    @core.Cog.listener("on_message")
+    async def logging_cache_message(self, message: discord.Message):
+        if message.guild is None or message.author.bot or not isinstance(message.channel, discord.abc.GuildChannel):
             return
+        logging = self.get_logging(message.guild.id)
+        if not logging or not (logging.message_delete or logging.message_edit):
+            return
+        if (await self.bot.get_command_info(message)).valid:
+            return
+        self.message_cache.add(message.guild.id, LoggedMessage.from_message(message))
 
-        destination = logging.webhook
+    @core.Cog.listener("on_raw_message_delete")
+    async def logging_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id is None:
+            return
+        cached = self.message_cache.pop(payload.guild_id, payload.message_id)
+        logging = self.get_logging(payload.guild_id)
+        if not logging or not logging.message_delete:
+            return
 
-        if isinstance(message, discord.Message):
-            context = await self.bot.get_context(message)
-            if context.valid or message.author.bot or not isinstance(message.channel, discord.abc.GuildChannel):
+        if cached is None:
+            # Sent before logging was enabled, but still in the bot's message cache.
+            message = payload.cached_message
+            if message is None or message.author.bot or not isinstance(message.channel, discord.abc.GuildChannel):
                 return
-            container = ui.Container(
-                ui.TextDisplay(
-                    f"### Message Delete\nMessage from {message.author.mention} was deleted in {message.channel.mention}"
-                ),
-                ui.TextDisplay(f"**Deleted content**\n>>> {message.content or '*No message content*'}"),
-                ui.TextDisplay(f"-# Deleted on {timestamp(dt.datetime.now(dt.timezone.utc))}"),
-                accent_color=discord.Color.red(),
-            )
-            view = ui.LayoutView()
-            view.add_item(container)
-            try:
-                await destination.send(view=view, allowed_mentions=NO_MENTIONS)
-            except discord.HTTPException:
+            if (await self.bot.get_command_info(message)).valid:
                 return
-            return
+            cached = LoggedMessage.from_message(message)
+
+        container = ui.Container(
+            ui.TextDisplay(
+                f"### Message Delete\nMessage from {cached.author_mention} was deleted in {cached.channel_mention}"
+            ),
+            ui.TextDisplay(f"**Deleted content**\n>>> {cached.content or '*No message content*'}"),
+            ui.TextDisplay(f"-# Deleted on {timestamp(dt.datetime.now(dt.timezone.utc))}"),
+            accent_color=discord.Color.red(),
+        )
+        self.bot.webhooks.send(logging.webhook, container)
 
-        assert isinstance(message, list)
-        messages: list[discord.Message] = message
-
-        list_of_messages = []
-        for _message in messages:
-            time = format(timestamp(_message.created_at), "t")
-            content = escape_markdown(_message.content[:90]) or "*No content*"
-            list_of_messages.append(f"[{time}] {_message.author}: {content}")
-        for _message in messages:
-            if len(_message.content) > 100:
-                content = escape_markdown(f"{_message.content[:100]}...")
-            else:
-                content = escape_markdown(_message.content) or "*No content*"
-            list_of_messages.append(f"[{timestamp(_message.created_at):t}] {_message.author}: {content}")
-        if not list_of_messages:
+    @core.Cog.listener("on_raw_bulk_message_delete")
+    async def logging_bulk_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.guild_id is None:
+            return
+        fallback = {message.id: message for message in payload.cached_messages}
+        messages: list[LoggedMessage] = []
+        for message_id in sorted(payload.message_ids):
+            cached = self.message_cache.pop(payload.guild_id, message_id)
+            if cached is None and message_id in fallback:
+                cached = LoggedMessage.from_message(fallback[message_id])
+            if cached is not None:
+                messages.append(cached)
+
+        logging = self.get_logging(payload.guild_id)
+        if not logging or not logging.message_delete or not messages:
             return
+
+        log = BulkDeleteLog()
+        for message in messages:
+            log.add(message, str(self.bot.get_user(message.author_id) or message.author_id))
+
+        deleted = len(payload.message_ids)
         container = ui.Container(ui.TextDisplay("### Bulk Message Delete"), accent_color=discord.Color.red())
-        message_log = "\n\n----------\n\n".join(list_of_messages)
+        footer = ui.TextDisplay(
+            f"-# {deleted} messages deleted{f', {log.count} logged' if log.count < deleted else ''}\n"
+            f"-# Messages deleted on {timestamp(dt.datetime.now(dt.timezone.utc))}"
+        )
 
-        view = ui.LayoutView()
-        if len(message_log) > 4000:
+        message_file = log.to_file("messages.txt")
+        if message_file is not None:
             container.add_item(ui.File("attachment://messages.txt"))
-            message_file = discord.File(filename="messages.txt", fp=BytesIO(message_log.encode("utf-8")))
-            view.add_item(container)
-            try:
-                await destination.send(view=view, file=message_file, allowed_mentions=NO_MENTIONS)
-            except discord.HTTPException:
-                return
+            container.add_item(footer)
+            self.bot.webhooks.send(logging.webhook, container, file=message_file)
             return
-        container.add_item(ui.TextDisplay("\n".join(list_of_messages)))
-        container.add_item(
-            ui.TextDisplay(
-                f"-# {len(messages)} messages deleted\n-# Messages deleted on {timestamp(dt.datetime.now(dt.timezone.utc))}"
-            )
-        )
-        view.add_item(container)
-        try:
-            await destination.send(view=view, allowed_mentions=NO_MENTIONS)
-        except discord.HTTPException:
+        container.add_item(ui.TextDisplay(log.text))
+        container.add_item(footer)
+        self.bot.webhooks.send(logging.webhook, container)
+
+    @core.Cog.listener("on_raw_message_edit")
+    async def logging_edit(self, payload: discord.RawMessageUpdateEvent):
+        after = payload.message
+        # Embed and pin updates do not carry content.
+        if payload.guild_id is None or "content" not in payload.data:
             return
-        return
-
-    @core.Cog.listener("on_message_edit")
-    async def logging_edit(self, before: discord.Message, after: discord.Message):
-        context = await self.bot.get_context(after)
-
-        if (
-            before.author.bot
-            or context.valid
-            or before.guild is None
-            or after.guild is None
-            or not isinstance(before.channel, discord.abc.GuildChannel)
-            or not isinstance(after.channel, discord.abc.GuildChannel)
-        ):
+
+        cached = self.message_cache.get(payload.guild_id, payload.message_id)
+        if cached is not None:
+            before_content = cached.content
+            cached.content = after.content
+        elif payload.cached_message is not None:
+            before_content = payload.cached_message.content
+        else:
             return
 
-        settings = self.bot.database.get_guild(after.guild.id)
-        logging = settings.logging if settings else None
+        if after.author.bot or not isinstance(after.channel, discord.abc.GuildChannel) or before_content == after.content:
+            return
+
+        logging = self.get_logging(payload.guild_id)
+        if not logging or not logging.message_edit:
+            return
 
-        if (
-            not logging
-            or not logging.enabled
-            or not logging.message_edit
-            or not logging.webhook
-            or before.content == after.content
-        ):
+        if (await self.bot.get_command_info(after)).valid:
             return
 
-        old_content = f"{before.content[:1021]}..." if len(before.content) > 1024 else before.content
+        old_content = f"{before_content[:1021]}..." if len(before_content) > 1024 else before_content
         new_content = f"{after.content[:1021]}..." if len(after.content) > 1024 else after.content
 
         container = ui.Container(
             ui.TextDisplay(
-                f"### Message Edited\nA [message]({before.jump_url}) sent "
-                f"by {before.author.mention} in {before.channel.mention} was edited."
+                f"### Message Edited\nA [message]({after.jump_url}) sent "
+                f"by {after.author.mention} in {after.channel.mention} was edited."
             ),
             ui.TextDisplay(f"**Before**\n>>> {old_content}"),
             ui.TextDisplay(f"**After**\n>>> {new_content}"),
@@ -172,14 +230,11 @@ class BotLogs(core.Cog):
             accent_color=discord.Color.gold(),
         )
 
-        view = ui.LayoutView()
-        view.add_item(container)
+        self.bot.webhooks.send(logging.webhook, container)
 
-        try:
-            await logging.webhook.send(view=view, allowed_mentions=NO_MENTIONS)
-        except discord.HTTPException:
-            return
-        return
+    @core.Cog.listener("on_guild_remove")
+    async def logging_guild_remove(self, guild: discord.Guild):
+        self.message_cache.discard_guild(guild.id)
 
     @core.Cog.listener("on_member_join")
     async def logging_member_join(self, member: discord.Member) -> None:
@@ -188,6 +243,7 @@ class BotLogs(core.Cog):
         if not logging or not logging.enabled or not logging.webhook or not logging.member_join:
             return
 
+        await self.bot.chunker.request(member.guild)
         name = f"{member.display_name}{f' ({member.name})' if member.display_name != member.name else ''}"
         sort = sorted(member.guild.members, key=lambda m: getattr(m, "joined_at"))
         pos = f"{ordinal(sort.index(member) + 1)} to join"
@@ -206,10 +262,7 @@ class BotLogs(core.Cog):
         )
         # fmt: on
 
-        view = ui.LayoutView()
-        view.add_item(container)
-
-        await logging.webhook.send(view=view)
+        self.bot.webhooks.send(logging.webhook, container)
 
     @core.Cog.listener("on_member_remove")
     async def logging_member_leave(self, member: discord.Member) -> None:
@@ -231,10 +284,7 @@ class BotLogs(core.Cog):
             accent_color=discord.Color.brand_red(),
         )
         # fmt: on
-        view = ui.LayoutView()
-        view.add_item(container)
-
-        await logging.webhook.send(view=view)
+        self.bot.webhooks.send(logging.webhook, container)
 
     @core.Cog.listener("on_audit_log_entry_create")
     async def logging_ban_kick(self, entry: discord.AuditLogEntry):
@@ -270,9 +320,7 @@ class BotLogs(core.Cog):
 
         if not message:
             return
-        with contextlib.suppress(discord.HTTPException):
-            await logging.webhook.send(message)
-            return
+        self.bot.webhooks.send(logging.webhook, message)
 
     @core.Cog.listener("on_guild_channel_update")
     async def logging_channel_edit(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
@@ -321,28 +369,29 @@ class BotLogs(core.Cog):
             ui.TextDisplay(display_content),
             accent_color=discord.Color.gold(),
         )
-        view = ui.LayoutView()
-        view.add_item(container)
-
-        try:
-            await logging.webhook.send(view=view)
-        except discord.HTTPException:
-            pass
+        self.bot.webhooks.send(logging.webhook, container)
 
     @core.Cog.listener("on_guild_channel_delete")
     async def logging_channel_delete(self, channel: discord.abc.GuildChannel):
+        self.message_cache.discard_channel(channel.guild.id, channel.id)
         settings = self.bot.database.get_guild(channel.guild.id)
         logging = settings.logging if settings else None
         if not logging or not logging.enabled or not logging.channel_delete or not logging.webhook:
-            return None
+            return
 
-        return await logging.webhook.send(f"[**{timestamp(dt.datetime.now(dt.timezone.utc))}**] #{channel.name} was deleted")
+        message = f"[**{timestamp(dt.datetime.now(dt.timezone.utc))}**] #{channel.name} was deleted"
+        self.bot.webhooks.send(logging.webhook, message)
 
     @core.Cog.listener("on_guild_update")
     async def logging_guild(self, before: discord.Guild, after: discord.Guild):
         pass
 
     async def bot_check(self, ctx: Context) -> bool:
+        if not ctx.database.is_ready():
+            try:
+                await asyncio.wait_for(ctx.database.wait_until_ready(), timeout=10)
+            except asyncio.TimeoutError:
+                raise DatabaseNotReady from None
         blacklisted = ctx.database.get_blacklist(ctx.author.id)
         if blacklisted:
             raise Blacklisted(reason=blacklisted.reason)
@@ -358,14 +407,6 @@ class BotLogs(core.Cog):
             raise Maintenance()
         return True
 
-    @tasks.loop(minutes=30)
-    async def clear_cache(self):
-        self.bot.command_cache.clear()
-
-    @clear_cache.before_loop
-    async def before_clear_cache(self):
-        await self.bot.wait_until_ready()
-
 
 async def setup(bot):
     await bot.add_cog(BotLogs(bot))
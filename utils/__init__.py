@@ -17,10 +17,22 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 """
 
 # flake8: noqa
+from .cache import *
+from .chunking import *
 from .converters import *
 from .database import *
 from .emojis import *
 from .helpers import *
+from .highlights import *
+from .logcache import *
+from .metrics import *
+from .monitor import *
 from .paginators import *
 from .parse import *
+from .pool import *
+from .redaction import *
+from .statements import *
+from .usage import *
 from .views import *
+from .webhooks import *
+from .writebuffer import *
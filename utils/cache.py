@@ -0,0 +1,128 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Generic, Iterator, TypeVar, overload
+
+__all__ = ("LRUCache",)
+
+K = TypeVar("K")
+V = TypeVar("V")
+T = TypeVar("T")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    A mapping bounded by size, with an optional time to live for each entry.
+
+    The least recently used entries are evicted first. Only lookups through
+    get and [] count towards the hit rate.
+    """
+
+    __slots__ = ("_data", "hits", "maxsize", "misses", "ttl")
+
+    def __init__(self, *, maxsize: int, ttl: float | None = None) -> None:
+        self.maxsize: int = maxsize
+        self.ttl: float | None = ttl
+        self.hits: int = 0
+        self.misses: int = 0
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __repr__(self) -> str:
+        return f"<LRUCache size={len(self)} maxsize={self.maxsize} hit_rate={self.hit_rate:.2%}>"
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        return iter(list(self._data))
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._data.get(key)  # type: ignore
+        if entry is None:
+            return False
+        if entry[0] < time.monotonic():
+            del self._data[key]  # type: ignore
+            return False
+        return True
+
+    def __getitem__(self, key: K) -> V:
+        if key not in self:
+            self.misses += 1
+            raise KeyError(key)
+        self.hits += 1
+        self._data.move_to_end(key)
+        return self._data[key][1]
+
+    def __setitem__(self, key: K, value: V) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        self._data[key] = (expires, value)
+        self._data.move_to_end(key)
+        self._evict()
+
+    def __delitem__(self, key: K) -> None:
+        del self._data[key]
+
+    def _evict(self) -> None:
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+        now = time.monotonic()
+        while self._data:
+            key, (expires, _) = next(iter(self._data.items()))
+            if expires >= now:
+                break
+            del self._data[key]
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @overload
+    def get(self, key: K) -> V | None: ...
+
+    @overload
+    def get(self, key: K, default: T) -> V | T: ...
+
+    def get(self, key: K, default: T | None = None) -> V | T | None:
+        if key not in self:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return self._data[key][1]
+
+    @overload
+    def pop(self, key: K) -> V | None: ...
+
+    @overload
+    def pop(self, key: K, default: T) -> V | T: ...
+
+    def pop(self, key: K, default: T | None = None) -> V | T | None:
+        if key not in self:
+            return default
+        return self._data.pop(key)[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
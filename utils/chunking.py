@@ -0,0 +1,189 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import time
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import discord
+
+__all__ = ("ChunkScheduler",)
+
+_log = logging.getLogger("alpine")
+
+# Queue ranks, lowest first.
+PRIORITY = 0
+DEMAND = 1
+BACKGROUND = 2
+RUNNING = -1
+
+
+class ChunkScheduler:
+    """
+    Chunks guild members when they are first needed instead of at startup.
+
+    Requests for a guild share one chunk, at most ``concurrency`` guilds are chunked at once,
+    and guilds for which ``is_priority`` returns True go first. If ``idle_after`` is set, the
+    member caches of other guilds are dropped once they have not been used for that many seconds.
+    """
+
+    def __init__(self, bot: discord.Client, *, concurrency: int = 2, idle_after: float | None = None) -> None:
+        self.bot: discord.Client = bot
+        self.concurrency: int = concurrency
+        self.idle_after: float | None = idle_after
+        self.is_priority: Callable[[int], bool] = lambda guild_id: False
+        self.chunked: int = 0
+        self.evicted: int = 0
+        self.chunk_time: float = 0.0
+        self._queue: asyncio.PriorityQueue[tuple[int, int, int]] = asyncio.PriorityQueue()
+        self._order: itertools.count[int] = itertools.count()
+        self._pending: dict[int, asyncio.Future[None]] = {}
+        self._ranks: dict[int, int] = {}
+        self._last_used: dict[int, float] = {}
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def __repr__(self) -> str:
+        return f"<ChunkScheduler pending={len(self._pending)} chunked={self.chunked} evicted={self.evicted}>"
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> int:
+        return sum(rank == RUNNING for rank in self._ranks.values())
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"alpine: chunk worker {number}") for number in range(self.concurrency)
+        ]
+        if self.idle_after:
+            self._tasks.append(asyncio.create_task(self._evict_idle(), name="alpine: member cache eviction"))
+
+    def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks.clear()
+        for future in self._pending.values():
+            if not future.done():
+                future.cancel()
+        self._pending.clear()
+        self._ranks.clear()
+
+    def touch(self, guild_id: int) -> None:
+        self._last_used[guild_id] = time.monotonic()
+
+    def forget(self, guild_id: int) -> None:
+        self._last_used.pop(guild_id, None)
+
+    def schedule(self, guild: discord.Guild, *, background: bool = False) -> asyncio.Future[None] | None:
+        """
+        Queues the guild to be chunked without waiting for it.
+
+        Returns the future that completes once the guild is chunked, or None if it already is.
+        """
+        self.touch(guild.id)
+        if guild.chunked:
+            return None
+
+        future = self._pending.get(guild.id)
+        if future is None:
+            future = self._pending[guild.id] = asyncio.get_running_loop().create_future()
+
+        rank = PRIORITY if self.is_priority(guild.id) else BACKGROUND if background else DEMAND
+        # A guild already queued is queued again only if this request is more urgent.
+        if rank < self._ranks.get(guild.id, BACKGROUND + 1):
+            self._ranks[guild.id] = rank
+            self._queue.put_nowait((rank, next(self._order), guild.id))
+        return future
+
+    async def request(self, guild: discord.Guild) -> None:
+        """
+        Chunks the guild if needed and waits until it is done.
+        """
+        future = self.schedule(guild)
+        if future is not None:
+            await asyncio.shield(future)
+
+    def warm_up(self) -> int:
+        """
+        Queues every priority guild, returning how many were queued.
+        """
+        queued = 0
+        for guild in self.bot.guilds:
+            if not guild.chunked and self.is_priority(guild.id):
+                self.schedule(guild)
+                queued += 1
+        return queued
+
+    async def _worker(self) -> None:
+        while True:
+            rank, _, guild_id = await self._queue.get()
+            # Entries replaced by a more urgent one, or for guilds already done, are skipped.
+            if self._ranks.get(guild_id) != rank:
+                continue
+            self._ranks[guild_id] = RUNNING
+
+            guild = self.bot.get_guild(guild_id)
+            try:
+                if guild is not None and not guild.chunked:
+                    start = time.perf_counter()
+                    await guild.chunk()
+                    self.chunk_time += time.perf_counter() - start
+                    self.chunked += 1
+                    self.bot.dispatch("guild_chunk", guild)
+            except Exception as exc:
+                _log.warning(f"Failed to chunk guild {guild_id}: {exc!r}")
+            finally:
+                self._ranks.pop(guild_id, None)
+                future = self._pending.pop(guild_id, None)
+                if future is not None and not future.done():
+                    future.set_result(None)
+
+    def evict(self, guild: discord.Guild) -> int:
+        """
+        Drops the guild's cached members, keeping the bot and members in voice channels.
+
+        Returns the number of members dropped.
+        """
+        keep = {guild.me.id, *guild._voice_states}
+        members = guild._members
+        dropped = [member_id for member_id in members if member_id not in keep]
+        for member_id in dropped:
+            del members[member_id]
+        if dropped:
+            self.evicted += 1
+        return len(dropped)
+
+    async def _evict_idle(self) -> None:
+        assert self.idle_after is not None
+        while True:
+            await asyncio.sleep(min(self.idle_after, 300))
+            cutoff = time.monotonic() - self.idle_after
+            for guild in self.bot.guilds:
+                if not guild.chunked or guild.id in self._pending or self.is_priority(guild.id):
+                    continue
+                if self._last_used.get(guild.id, 0) < cutoff and (dropped := self.evict(guild)):
+                    _log.debug(f"Dropped {dropped} cached members of idle guild {guild.id}")
@@ -18,13 +18,23 @@ along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import re
+import secrets
 from abc import ABC, abstractmethod
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Callable, ClassVar, Mapping, MutableMapping
 
 import asyncpg
 import discord
 
+from .cache import LRUCache
+from .highlights import HighlightIndex
+from .pool import InstrumentedConnection, InstrumentedPool
+from .statements import StatementRegistry
+from .usage import CommandUsage
+from .writebuffer import WriteBuffer
+
 if TYPE_CHECKING:
     from core.alpine import Bot
 
@@ -42,8 +52,61 @@ __all__ = (
 
 _log = logging.getLogger("alpine")
 
+NOTIFY_CHANNEL = "alpine_cache"
+
+
+def _none() -> None:
+    return None
+
 
 class BaseData(ABC):
+    """
+    A cached table row.
+
+    Each column in ``_columns`` is stored in a ``_<column>`` slot, initialised
+    from the column's default factory until a record is loaded.
+    """
+
+    __slots__ = ("database",)
+
+    _table: ClassVar[str]
+    _primary_key: ClassVar[str]
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {}
+
+    database: Database
+
+    def _set_defaults(self) -> None:
+        for column, default in self._columns.items():
+            setattr(self, f"_{column}", default())
+
+    def _load(self, record: Mapping[str, Any]) -> None:
+        columns = self._columns
+        for column, value in record.items():
+            if column in columns:
+                setattr(self, f"_{column}", value)
+
+    async def _write(self, query: str, *args: Any) -> asyncpg.Record | None:
+        """
+        Runs a query ending in RETURNING, notifying other processes of the change in the same statement.
+        """
+        notification = self.database.notification(self._table, getattr(self, self._primary_key))
+        return await self.database.pool.fetchrow(self.database.notifying(query), *args, *notification)
+
+    async def _update(self, values: dict[str, Any], *, defer: bool = False) -> None:
+        key: int = getattr(self, self._primary_key)
+        writer = self.database.writer
+        if defer:
+            self.database.statements.check(self._table, values)
+            self._load(values)
+            writer.queue(self._table, self._primary_key, key, values)
+            return
+
+        # Anything still buffered for this row is written now, so RETURNING does not undo it.
+        values = {**writer.pop(self._table, self._primary_key, key), **values}
+        query, columns = self.database.statements.update(self._table, values)
+        self._load(await self._write(query, key, *(values[column] for column in columns)))
+        self.database.statements.record(query)
+
     def __repr__(self) -> str:
         name = self.__class__.__name__
         attrs = [name for name, value in self.__class__.__dict__.items() if isinstance(value, property)]
@@ -65,10 +128,26 @@ class BaseData(ABC):
 
 
 class GuildData(BaseData):
+    __slots__ = ("_auto_unarchive", "_disabled_channels", "_disabled_commands", "_prefixes", "guild_id")
+
+    _table: ClassVar[str] = "guild_settings"
+    _primary_key: ClassVar[str] = "guild_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "prefixes": list,
+        "disabled_commands": list,
+        "disabled_channels": list,
+        "auto_unarchive": list,
+    }
+
+    _prefixes: list[str]
+    _disabled_commands: list[str]
+    _disabled_channels: list[int]
+    _auto_unarchive: list[int]
+
     def __init__(self, guild_id: int, database: Database) -> None:
         self.guild_id: int = guild_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._guilds[guild_id] = self
 
@@ -81,43 +160,42 @@ class GuildData(BaseData):
                 RETURNING *
                 """
         self.database._guilds[self.guild_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id))
+        self._load(await self._write(query, self.guild_id))
+        self.database.bot.invalidate_prefixes(self.guild_id)
         return self
 
-    async def update(self, **kwargs: Any) -> GuildData:
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE guild_settings
-                SET {",".join(fmt)}
-                WHERE guild_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any) -> GuildData:
+        await self._update(kwargs, defer=defer)
+        if "prefixes" in kwargs:
+            self.database.bot.invalidate_prefixes(self.guild_id)
         return self
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM guild_settings
                 WHERE guild_id = $1
+                RETURNING guild_id
                 """
+        self.database.writer.pop(self._table, self._primary_key, self.guild_id)
         del self.database._guilds[self.guild_id]
-        await self.database.pool.execute(query, self.guild_id)
+        self.database.bot.invalidate_prefixes(self.guild_id)
+        await self._write(query, self.guild_id)
 
     @property
     def prefixes(self) -> list[str]:
-        return self._data.get("prefixes", [])
+        return self._prefixes
 
     @property
     def disabled_commands(self) -> list[str]:
-        return self._data.get("disabled_commands", [])
+        return self._disabled_commands
 
     @property
     def disabled_channels(self) -> list[int]:
-        return self._data.get("disabled_channels", [])
+        return self._disabled_channels
 
     @property
     def auto_unarchive(self) -> list[int]:
-        return self._data.get("auto_unarchive", [])
+        return self._auto_unarchive
 
     @property
     def verification(self) -> VerificationData | None:
@@ -145,10 +223,28 @@ class GuildData(BaseData):
 
 
 class VerificationData(BaseData):
+    __slots__ = ("_channel_id", "_high", "_low", "_medium", "_role_id", "guild_id")
+
+    _table: ClassVar[str] = "verification"
+    _primary_key: ClassVar[str] = "guild_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "role_id": int,
+        "channel_id": int,
+        "low": bool,
+        "medium": bool,
+        "high": bool,
+    }
+
+    _role_id: int
+    _channel_id: int
+    _low: bool
+    _medium: bool
+    _high: bool
+
     def __init__(self, guild_id: int, database: Database) -> None:
         self.guild_id: int = guild_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._verification[guild_id] = self
 
@@ -161,55 +257,94 @@ class VerificationData(BaseData):
                 RETURNING *
                 """
         self.database._verification[self.guild_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id))
+        self._load(await self._write(query, self.guild_id))
         return self
 
-    async def update(self, **kwargs: Any) -> VerificationData:
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE verification
-                SET {",".join(fmt)}
-                WHERE guild_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any) -> VerificationData:
+        await self._update(kwargs, defer=defer)
         return self
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM verification
                 WHERE guild_id = $1
+                RETURNING guild_id
                 """
+        self.database.writer.pop(self._table, self._primary_key, self.guild_id)
         del self.database._verification[self.guild_id]
-        await self.database.pool.execute(query)
+        await self._write(query, self.guild_id)
 
     @property
     def role_id(self) -> int:
-        return self._data.get("role_id", 0)
+        return self._role_id
 
     @property
     def channel_id(self) -> int:
-        return self._data.get("channel_id", 0)
+        return self._channel_id
 
     @property
     def low(self) -> bool:
-        return self._data.get("low", False)
+        return self._low
 
     @property
     def medium(self) -> bool:
-        return self._data.get("medium", False)
+        return self._medium
 
     @property
     def high(self) -> bool:
-        return self._data.get("high", False)
+        return self._high
 
 
 class LoggingData(BaseData):
+    __slots__ = (
+        "_cached_webhook",
+        "_channel_delete",
+        "_channel_edit",
+        "_channel_id",
+        "_enabled",
+        "_guild_edit",
+        "_member_ban",
+        "_member_join",
+        "_member_leave",
+        "_message_delete",
+        "_message_edit",
+        "_webhook",
+        "guild_id",
+    )
+
+    _table: ClassVar[str] = "logging"
+    _primary_key: ClassVar[str] = "guild_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "enabled": bool,
+        "webhook": _none,
+        "channel_id": int,
+        "message_delete": bool,
+        "message_edit": bool,
+        "member_join": bool,
+        "member_leave": bool,
+        "member_ban": bool,
+        "channel_edit": bool,
+        "channel_delete": bool,
+        "guild_edit": bool,
+    }
+
+    _enabled: bool
+    _webhook: str | None
+    _channel_id: int
+    _message_delete: bool
+    _message_edit: bool
+    _member_join: bool
+    _member_leave: bool
+    _member_ban: bool
+    _channel_edit: bool
+    _channel_delete: bool
+    _guild_edit: bool
+
     def __init__(self, guild_id: int, database: Database) -> None:
         self.guild_id: int = guild_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
-        self._webhook: discord.Webhook | None = None
+        self._set_defaults()
+        self._cached_webhook: discord.Webhook | None = None
 
         self.database._logging[guild_id] = self
 
@@ -222,90 +357,101 @@ class LoggingData(BaseData):
                 RETURNING *
                 """
         self.database._logging[self.guild_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id))
+        self._load(await self._write(query, self.guild_id))
         return self
 
-    async def update(self, **kwargs: Any):
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE logging
-                SET {",".join(fmt)}
-                WHERE guild_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any):
+        await self._update(kwargs, defer=defer)
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM logging
                 WHERE guild_id = $1
+                RETURNING guild_id
                 """
+        self.database.writer.pop(self._table, self._primary_key, self.guild_id)
         del self.database._logging[self.guild_id]
-        await self.database.pool.execute(query)
+        await self._write(query, self.guild_id)
 
     @property
     def enabled(self) -> bool:
-        return self._data.get("enabled", False)
+        return self._enabled
 
     @property
     def webhook_url(self) -> str | None:
-        return self._data.get("webhook")
+        return self._webhook
 
     @property
     def webhook(self) -> discord.Webhook | None:
-        url: str | None = self._data.get("webhook")
+        url: str | None = self._webhook
 
         if not url:
             return None
-        if self._webhook and self._webhook.url == url:
-            return self._webhook
+        if self._cached_webhook and self._cached_webhook.url == url:
+            return self._cached_webhook
 
         webhook = discord.Webhook.from_url(url, client=self.database.bot, bot_token=self.database.bot.http.token)
-        self._webhook = webhook
+        self._cached_webhook = webhook
         return webhook
 
     @property
     def channel_id(self) -> int:
-        return self._data.get("channel_id", 0)
+        return self._channel_id
 
     @property
     def message_delete(self) -> bool:
-        return self._data.get("message_delete", False)
+        return self._message_delete
 
     @property
     def message_edit(self) -> bool:
-        return self._data.get("message_edit", False)
+        return self._message_edit
 
     @property
     def member_join(self) -> bool:
-        return self._data.get("member_join", False)
+        return self._member_join
 
     @property
     def member_leave(self) -> bool:
-        return self._data.get("member_leave", False)
+        return self._member_leave
 
     @property
     def member_ban(self) -> bool:
-        return self._data.get("member_ban", False)
+        return self._member_ban
 
     @property
     def channel_edit(self) -> bool:
-        return self._data.get("channel_edit", False)
+        return self._channel_edit
 
     @property
     def channel_delete(self) -> bool:
-        return self._data.get("channel_delete", False)
+        return self._channel_delete
 
     @property
     def guild_edit(self) -> bool:
-        return self._data.get("guild_edit", False)
+        return self._guild_edit
 
 
 class JoinLeaveData(BaseData):
+    __slots__ = ("_channel_id", "_enabled", "_join_message", "_leave_message", "guild_id")
+
+    _table: ClassVar[str] = "join_leave"
+    _primary_key: ClassVar[str] = "guild_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "enabled": bool,
+        "channel_id": int,
+        "join_message": _none,
+        "leave_message": _none,
+    }
+
+    _enabled: bool
+    _channel_id: int
+    _join_message: str | None
+    _leave_message: str | None
+
     def __init__(self, guild_id: int, database: Database) -> None:
         self.guild_id: int = guild_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._join_leave[guild_id] = self
 
@@ -318,49 +464,58 @@ class JoinLeaveData(BaseData):
                 RETURNING *
                 """
         self.database._join_leave[self.guild_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id))
+        self._load(await self._write(query, self.guild_id))
         return self
 
-    async def update(self, **kwargs: Any):
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE join_leave
-                SET {",".join(fmt)}
-                WHERE guild_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.guild_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any):
+        await self._update(kwargs, defer=defer)
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM join_leave
                 WHERE guild_id = $1
+                RETURNING guild_id
                 """
+        self.database.writer.pop(self._table, self._primary_key, self.guild_id)
         del self.database._join_leave[self.guild_id]
-        await self.database.pool.execute(query)
+        await self._write(query, self.guild_id)
 
     @property
     def enabled(self) -> bool:
-        return self._data.get("enabled", False)
+        return self._enabled
 
     @property
     def channel_id(self) -> int:
-        return self._data.get("channel_id", 0)
+        return self._channel_id
 
     @property
     def join_message(self) -> str | None:
-        return self._data.get("join_message")
+        return self._join_message
 
     @property
     def leave_message(self) -> str | None:
-        return self._data.get("leave_message")
+        return self._leave_message
 
 
 class UserData(BaseData):
+    __slots__ = ("_color", "_dmed", "_timezone", "user_id")
+
+    _table: ClassVar[str] = "user_settings"
+    _primary_key: ClassVar[str] = "user_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "timezone": _none,
+        "color": int,
+        "dmed": bool,
+    }
+
+    _timezone: str | None
+    _color: int
+    _dmed: bool
+
     def __init__(self, user_id: int, database: Database) -> None:
         self.user_id: int = user_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._users[user_id] = self
 
@@ -373,46 +528,55 @@ class UserData(BaseData):
                 RETURNING *
                 """
         self.database._users[self.user_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id))
+        self.database._missing_users.pop(self.user_id)
+        self._load(await self._write(query, self.user_id))
         return self
 
-    async def update(self, **kwargs: Any) -> UserData:
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE user_settings
-                SET {",".join(fmt)}
-                WHERE user_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any) -> UserData:
+        await self._update(kwargs, defer=defer)
         return self
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM user_settings
                 WHERE user_id = $1
+                RETURNING user_id
                 """
-        del self.database._users[self.user_id]
-        await self.database.pool.execute(query)
+        self.database.writer.pop(self._table, self._primary_key, self.user_id)
+        self.database._users.pop(self.user_id)
+        self.database._missing_users[self.user_id] = True
+        await self._write(query, self.user_id)
 
     @property
     def timezone(self) -> str | None:
-        return self._data.get("timezone")
+        return self._timezone
 
     @property
     def color(self) -> int:
-        return self._data.get("color", 0)
+        return self._color
 
     @property
     def dmed(self) -> bool:
-        return self._data.get("dmed", False)
+        return self._dmed
 
 
 class HighlightsData(BaseData):
+    __slots__ = ("_blocked", "_triggers", "user_id")
+
+    _table: ClassVar[str] = "highlights"
+    _primary_key: ClassVar[str] = "user_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "triggers": list,
+        "blocked": list,
+    }
+
+    _triggers: list[str]
+    _blocked: list[int]
+
     def __init__(self, user_id: int, database: Database) -> None:
         self.user_id: int = user_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._highlights[user_id] = self
 
@@ -425,42 +589,53 @@ class HighlightsData(BaseData):
                 RETURNING *
                 """
         self.database._highlights[self.user_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id))
+        self._load(await self._write(query, self.user_id))
+        self.database.highlight_index.update(self.user_id, self.triggers)
+        self.database.bot.dispatch("highlights_insert", self)
         return self
 
-    async def update(self, **kwargs: Any) -> HighlightsData:
-        fmt = [f"{item} = ${number}" for number, item in enumerate(kwargs.keys(), start=2)]
-        query = f"""
-                UPDATE highlights
-                SET {",".join(fmt)}
-                WHERE user_id = $1
-                RETURNING *
-                """
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id, *kwargs.values()))
+    async def update(self, *, defer: bool = False, **kwargs: Any) -> HighlightsData:
+        await self._update(kwargs, defer=defer)
+        if "triggers" in kwargs:
+            self.database.highlight_index.update(self.user_id, self.triggers)
         return self
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM highlights
                 WHERE user_id = $1
+                RETURNING user_id
                 """
+        self.database.writer.pop(self._table, self._primary_key, self.user_id)
         del self.database._highlights[self.user_id]
-        await self.database.pool.execute(query)
+        self.database.highlight_index.remove(self.user_id)
+        self.database.bot.dispatch("highlights_delete", self)
+        await self._write(query, self.user_id)
 
     @property
     def triggers(self) -> list[str]:
-        return self._data.get("triggers", [])
+        return self._triggers
 
     @property
     def blocked(self) -> list[int]:
-        return self._data.get("blocked", [])
+        return self._blocked
 
 
 class BlacklistData(BaseData):
+    __slots__ = ("_reason", "user_id")
+
+    _table: ClassVar[str] = "blacklist"
+    _primary_key: ClassVar[str] = "user_id"
+    _columns: ClassVar[dict[str, Callable[[], Any]]] = {
+        "reason": str,
+    }
+
+    _reason: str
+
     def __init__(self, user_id: int, database: Database) -> None:
         self.user_id: int = user_id
         self.database: Database = database
-        self._data: dict[str, Any] = {}
+        self._set_defaults()
 
         self.database._blacklists[user_id] = self
 
@@ -473,7 +648,7 @@ class BlacklistData(BaseData):
                 RETURNING *
                 """
         self.database._blacklists[self.user_id] = self
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id, reason))
+        self._load(await self._write(query, self.user_id, reason))
         return self
 
     async def update(self, reason: str) -> None:
@@ -483,19 +658,20 @@ class BlacklistData(BaseData):
                 WHERE user_id = $1
                 RETURNING *
                 """
-        self._data.update(await self.database.pool.fetchrow(query, self.user_id, reason))
+        self._load(await self._write(query, self.user_id, reason))
 
     async def delete(self) -> None:
         query = """
                 DELETE FROM blacklist
                 WHERE user_id = $1
+                RETURNING user_id
                 """
         del self.database._blacklists[self.user_id]
-        await self.database.pool.execute(query, self.user_id)
+        await self._write(query, self.user_id)
 
     @property
     def reason(self) -> str:
-        return self._data["reason"]
+        return self._reason
 
 
 class Database:
@@ -503,7 +679,7 @@ class Database:
     Manages asyncpg Pool and the Cache.
     """
 
-    pool: asyncpg.Pool
+    pool: InstrumentedPool
 
     def __init__(self, bot: Bot) -> None:
         self.bot: Bot = bot
@@ -512,8 +688,22 @@ class Database:
         self._logging: dict[int, LoggingData] = {}
         self._join_leave: dict[int, JoinLeaveData] = {}
         self._blacklists: dict[int, BlacklistData] = {}
-        self._users: dict[int, UserData] = {}
+        # User settings are loaded on demand, only recently used users are kept.
+        self._users: LRUCache[int, UserData] = LRUCache(maxsize=10000)
+        self._missing_users: LRUCache[int, bool] = LRUCache(maxsize=50000, ttl=3600)
+        self._user_fetches: dict[int, asyncio.Task[UserData | None]] = {}
+        self.writer: WriteBuffer = WriteBuffer(self)
+        self.usage: CommandUsage = CommandUsage(self)
+        self.statements: StatementRegistry = StatementRegistry()
+        for cls in (GuildData, VerificationData, LoggingData, JoinLeaveData, UserData, HighlightsData, BlacklistData):
+            self.statements.register(cls._table, cls._primary_key, cls._columns)
+        # Identifies this process in cache notifications, so it can ignore its own writes.
+        self._origin: str = secrets.token_hex(8)
+        self._listener: InstrumentedConnection | None = None
+        self._refreshes: set[asyncio.Task[None]] = set()
         self._highlights: dict[int, HighlightsData] = {}
+        self.highlight_index: HighlightIndex = HighlightIndex()
+        self._ready: asyncio.Event = asyncio.Event()
         self.bot.loop.create_task(self.__initialize())
 
     def __repr__(self) -> str:
@@ -529,48 +719,165 @@ class Database:
         return f"<Database cache_size={sum(cache.__sizeof__() for cache in caches)}>"
 
     async def __initialize(self) -> None:
-        self.pool = await asyncpg.create_pool(**self.bot.settings["postgresql"])  # type: ignore
+        options = self.bot.settings.get("database", {})
+        pool = await asyncpg.create_pool(**self.bot.settings["postgresql"])  # type: ignore
+        self.pool = InstrumentedPool(pool, slow_query=options.get("slow_query_ms", 250) / 1000)
+        # Listen before loading, so changes made while the cache is populated are not missed.
+        try:
+            await self.__listen()
+        except (OSError, asyncpg.PostgresError):
+            _log.exception("Could not listen for cache notifications, retrying in the background.")
+            task = asyncio.create_task(self.__relisten())
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+        await self.usage.setup()
         await self.__populate_cache()
 
-    async def __populate_cache(self) -> None:
-        guilds = await self.pool.fetch("SELECT * FROM guild_settings")
-        verification = await self.pool.fetch("SELECT * FROM verification")
-        logging = await self.pool.fetch("SELECT * FROM logging")
-        join_leave = await self.pool.fetch("SELECT * FROM join_leave")
-        users = await self.pool.fetch("SELECT * FROM user_settings")
-        blacklists = await self.pool.fetch("SELECT * FROM blacklist")
-        highlights = await self.pool.fetch("SELECT * FROM highlights")
-        _log.info("Fetched data.")
+    async def close(self) -> None:
+        await self.writer.close()
+        await self.usage.close()
+        if self._listener is not None:
+            self._listener.remove_termination_listener(self.__on_listener_lost)
+            await self._listener.remove_listener(NOTIFY_CHANNEL, self.__on_notification)
+            await self.pool.release(self._listener)
+            self._listener = None
+
+    async def __listen(self) -> None:
+        connection = await self.pool.acquire()
+        try:
+            await connection.add_listener(NOTIFY_CHANNEL, self.__on_notification)
+        except BaseException:
+            await self.pool.release(connection)
+            raise
+        connection.add_termination_listener(self.__on_listener_lost)
+        self._listener = connection
+
+    def __on_listener_lost(self, connection: asyncpg.Connection) -> None:
+        _log.warning("Lost the cache notification connection, listening again.")
+        task = asyncio.create_task(self.__relisten())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def __relisten(self) -> None:
+        if self._listener is not None:
+            await self.pool.release(self._listener)
+            self._listener = None
+        while self._listener is None:
+            try:
+                await self.__listen()
+            except (OSError, asyncpg.PostgresError):
+                _log.exception("Could not listen for cache notifications, retrying in 5 seconds.")
+                await asyncio.sleep(5)
+
+    def notification(self, table: str, key: int) -> tuple[str, str]:
+        return NOTIFY_CHANNEL, f"{self._origin}:{table}:{key}"
+
+    def notifying(self, query: str) -> str:
+        """
+        Wraps a data-modifying query ending in RETURNING so that it also tells other processes
+        sharing the database that a cached row changed.
+
+        The notification channel and payload are passed after the query's own parameters.
+        """
+        index = max(map(int, re.findall(r"\$(\d+)", query)), default=0)
+        return f"WITH changed AS ({query}) SELECT changed.*, pg_notify(${index + 1}, ${index + 2}) FROM changed"
+
+    def __on_notification(self, connection: asyncpg.Connection, pid: int, channel: str, payload: str) -> None:
+        origin, table, key = payload.split(":")
+        if origin == self._origin:
+            return
+        task = asyncio.create_task(self.__refresh(table, int(key)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    def __caches(self) -> dict[str, tuple[MutableMapping[int, Any], type[BaseData]]]:
+        return {
+            "guild_settings": (self._guilds, GuildData),
+            "verification": (self._verification, VerificationData),
+            "logging": (self._logging, LoggingData),
+            "join_leave": (self._join_leave, JoinLeaveData),
+            "blacklist": (self._blacklists, BlacklistData),
+            "highlights": (self._highlights, HighlightsData),
+            "user_settings": (self._users, UserData),
+        }
+
+    def cache_sizes(self) -> dict[str, int]:
+        """
+        Returns how many rows of each table are cached.
+        """
+        return {table: len(cache) for table, (cache, _) in self.__caches().items()}
+
+    async def __refresh(self, table: str, key: int) -> None:
+        cached = self.__caches().get(table)
+        if cached is None:
+            return
+        cache, cls = cached
+
+        if cls is UserData:
+            # Users are loaded on demand, so the next lookup fetches the new row.
+            self._users.pop(key)
+            self._missing_users.pop(key)
+            return
+
+        record = await self.pool.fetchrow(f"SELECT * FROM {table} WHERE {cls._primary_key} = $1", key)
+        data: BaseData | None = cache.get(key)
+        if record is None:
+            if data is None:
+                return
+            del cache[key]
+            if isinstance(data, HighlightsData):
+                self.highlight_index.remove(key)
+                self.bot.dispatch("highlights_delete", data)
+        else:
+            created = data is None
+            if data is None:
+                data = cls(key, self)  # type: ignore
+            data._load(record)
+            # Changes this process has not written yet still win.
+            data._load(self.writer.get(table, cls._primary_key, key))
+            if isinstance(data, HighlightsData):
+                self.highlight_index.update(key, data.triggers)
+                if created:
+                    self.bot.dispatch("highlights_insert", data)
+
+        if cls is GuildData:
+            self.bot.invalidate_prefixes(key)
+
+    async def __load_table(self, table: str, key: str, cls: type[BaseData]) -> int:
+        count = 0
+        async with self.pool.acquire() as connection, connection.transaction():
+            async for record in connection.cursor(f"SELECT * FROM {table}", prefetch=1000):
+                data = cls(record[key], self)  # type: ignore
+                data._load(record)
+                count += 1
+        return count
 
-        for guild_data in guilds:
-            guild = GuildData(guild_data["guild_id"], self)
-            guild._data.update(guild_data)
-
-        for verification_data in verification:
-            verification = VerificationData(verification_data["guild_id"], self)
-            verification._data.update(verification_data)
-
-        for logging_data in logging:
-            logging = LoggingData(logging_data["guild_id"], self)
-            logging._data.update(logging_data)
-
-        for join_leave_data in join_leave:
-            join_leave = JoinLeaveData(join_leave_data["guild_id"], self)
-            join_leave._data.update(join_leave_data)
-
-        for user_data in users:
-            user = UserData(user_data["user_id"], self)
-            user._data.update(user_data)
-
-        for blacklist_data in blacklists:
-            blacklist = BlacklistData(blacklist_data["user_id"], self)
-            blacklist._data.update(blacklist_data)
-
-        for highlight_data in highlights:
-            highlight = HighlightsData(highlight_data["user_id"], self)
-            highlight._data.update(highlight_data)
-
-        _log.info("Cached data.")
+    async def __populate_cache(self) -> None:
+        tables = {
+            "guild_settings": ("guild_id", GuildData),
+            "verification": ("guild_id", VerificationData),
+            "logging": ("guild_id", LoggingData),
+            "join_leave": ("guild_id", JoinLeaveData),
+            "blacklist": ("user_id", BlacklistData),
+            "highlights": ("user_id", HighlightsData),
+        }
+        counts = await asyncio.gather(*(self.__load_table(table, key, cls) for table, (key, cls) in tables.items()))
+
+        for highlight in self._highlights.values():
+            self.highlight_index.update(highlight.user_id, highlight.triggers)
+
+        self._ready.set()
+        self.bot.invalidate_prefixes()
+        _log.info(f"Cached data: {', '.join(f'{count} {table}' for table, count in zip(tables, counts, strict=True))}.")
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    async def wait_until_ready(self) -> None:
+        """
+        Waits until every table has been loaded into the cache.
+        """
+        await self._ready.wait()
 
     def get_guild(self, guild_id: int) -> GuildData | None:
         return self._guilds.get(guild_id)
@@ -584,6 +891,40 @@ class Database:
     def get_blacklist(self, user_id: int) -> BlacklistData | None:
         return self._blacklists.get(user_id)
 
+    async def __load_user(self, user_id: int) -> UserData | None:
+        try:
+            record = await self.pool.fetchrow("SELECT * FROM user_settings WHERE user_id = $1", user_id)
+        finally:
+            self._user_fetches.pop(user_id, None)
+        # Changes this process has not written yet still win, even over a row that is not there yet.
+        pending = self.writer.get("user_settings", "user_id", user_id)
+        if record is None and not pending:
+            self._missing_users[user_id] = True
+            return None
+        user = UserData(user_id, self)
+        if record is not None:
+            user._load(record)
+        user._load(pending)
+        return user
+
+    async def find_user(self, user_id: int) -> UserData | None:
+        """
+        Gets a user's settings without creating a row for them.
+
+        Users that are not cached are loaded with a single query shared by concurrent callers,
+        and users without a row are remembered so they are not queried again.
+        """
+        user = self._users.get(user_id)
+        if user is not None or user_id in self._missing_users:
+            return user
+        if getattr(self, "pool", None) is None:
+            return None
+
+        task = self._user_fetches.get(user_id)
+        if task is None:
+            task = self._user_fetches[user_id] = asyncio.create_task(self.__load_user(user_id))
+        return await asyncio.shield(task)
+
     async def fetch_guild(self, guild_id: int) -> GuildData:
         guild = GuildData(guild_id, self)
         return await guild.insert()
@@ -604,4 +945,4 @@ class Database:
         return self.get_guild(guild_id) or await self.fetch_guild(guild_id)
 
     async def get_or_fetch_user(self, user_id: int) -> UserData:
-        return self.get_user(user_id) or await self.fetch_user(user_id)
+        return await self.find_user(user_id) or await self.fetch_user(user_id)
@@ -0,0 +1,163 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Container, Iterable
+
+__all__ = ("HighlightIndex",)
+
+WORD_REGEX = re.compile(r"\w+")
+
+
+def _is_word(content: str, index: int) -> bool:
+    if index < 0 or index >= len(content):
+        return False
+    char = content[index]
+    return char.isalnum() or char == "_"
+
+
+def _is_bounded(content: str, start: int, end: int) -> bool:
+    # Mirrors the ``\b`` anchors the old per-user regex used on both sides of a trigger.
+    return _is_word(content, start - 1) != _is_word(content, start) and _is_word(content, end - 1) != _is_word(
+        content, end
+    )
+
+
+class _Trigger:
+    __slots__ = ("offset", "subscribers", "text")
+
+    def __init__(self, text: str, offset: int) -> None:
+        self.text: str = text
+        self.offset: int = offset
+        self.subscribers: dict[int, str] = {}
+
+
+class HighlightIndex:
+    """
+    Maps highlight triggers to the users subscribed to them.
+
+    Triggers are keyed by their first word, so a message is scanned once no matter
+    how many users have highlights. The index is updated per user when their triggers change.
+    """
+
+    __slots__ = ("_by_token", "_loose", "_users")
+
+    def __init__(self) -> None:
+        self._users: dict[int, set[str]] = {}
+        self._by_token: dict[str, dict[str, _Trigger]] = {}
+        self._loose: dict[str, _Trigger] = {}
+
+    def __repr__(self) -> str:
+        return f"<HighlightIndex users={len(self._users)} triggers={len(self)}>"
+
+    def __len__(self) -> int:
+        return sum(len(bucket) for bucket in self._by_token.values()) + len(self._loose)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._users
+
+    def _bucket(self, normalized: str) -> tuple[dict[str, _Trigger], int]:
+        match = WORD_REGEX.search(normalized)
+        if match is None:
+            return self._loose, 0
+        return self._by_token.setdefault(match.group(), {}), match.start()
+
+    def _add(self, user_id: int, trigger: str, normalized: str) -> None:
+        bucket, offset = self._bucket(normalized)
+        entry = bucket.get(normalized)
+        if entry is None:
+            entry = bucket[normalized] = _Trigger(normalized, offset)
+        entry.subscribers[user_id] = trigger
+
+    def _discard(self, user_id: int, normalized: str) -> None:
+        match = WORD_REGEX.search(normalized)
+        bucket = self._loose if match is None else self._by_token.get(match.group(), {})
+        entry = bucket.get(normalized)
+        if entry is None:
+            return
+        entry.subscribers.pop(user_id, None)
+        if not entry.subscribers:
+            del bucket[normalized]
+            if match is not None and not bucket:
+                del self._by_token[match.group()]
+
+    def update(self, user_id: int, triggers: Iterable[str]) -> None:
+        """
+        Replaces a user's triggers, only touching the triggers that changed.
+        """
+        new = {trigger.lower(): trigger for trigger in triggers if trigger}
+        old = self._users.get(user_id, set())
+
+        for normalized in old - new.keys():
+            self._discard(user_id, normalized)
+        for normalized, trigger in new.items():
+            self._add(user_id, trigger, normalized)
+
+        if new:
+            self._users[user_id] = set(new)
+        else:
+            self._users.pop(user_id, None)
+
+    def remove(self, user_id: int) -> None:
+        for normalized in self._users.pop(user_id, ()):
+            self._discard(user_id, normalized)
+
+    def clear(self) -> None:
+        self._users.clear()
+        self._by_token.clear()
+        self._loose.clear()
+
+    def search(self, content: str, members: Container[int] | None = None) -> dict[int, str]:
+        """
+        Returns a mapping of user ID to the first trigger of theirs found in the content.
+
+        If members is given, only those users are considered.
+        """
+        if not content or not self._users or members is not None and not members:
+            return {}
+
+        content = content.lower()
+        found: dict[int, str] = {}
+
+        for match in WORD_REGEX.finditer(content):
+            bucket = self._by_token.get(match.group())
+            if not bucket:
+                continue
+            for entry in bucket.values():
+                start = match.start() - entry.offset
+                if start < 0 or not content.startswith(entry.text, start):
+                    continue
+                if not _is_bounded(content, start, start + len(entry.text)):
+                    continue
+                for user_id, trigger in entry.subscribers.items():
+                    if members is None or user_id in members:
+                        found.setdefault(user_id, trigger)
+
+        for entry in self._loose.values():
+            start = content.find(entry.text)
+            while start != -1:
+                if _is_bounded(content, start, start + len(entry.text)):
+                    for user_id, trigger in entry.subscribers.items():
+                        if members is None or user_id in members:
+                            found.setdefault(user_id, trigger)
+                    break
+                start = content.find(entry.text, start + 1)
+
+        return found
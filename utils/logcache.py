@@ -0,0 +1,114 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import discord
+
+__all__ = (
+    "LoggedMessage",
+    "MessageLogCache",
+)
+
+
+class LoggedMessage:
+    __slots__ = ("author_id", "channel_id", "content", "created_at", "id")
+
+    def __init__(
+        self, message_id: int, author_id: int, channel_id: int, content: str, created_at: datetime.datetime
+    ) -> None:
+        self.id: int = message_id
+        self.author_id: int = author_id
+        self.channel_id: int = channel_id
+        self.content: str = content
+        self.created_at: datetime.datetime = created_at
+
+    def __repr__(self) -> str:
+        return f"<LoggedMessage id={self.id} author_id={self.author_id} channel_id={self.channel_id}>"
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> LoggedMessage:
+        return cls(message.id, message.author.id, message.channel.id, message.content, message.created_at)
+
+    @property
+    def author_mention(self) -> str:
+        return f"<@{self.author_id}>"
+
+    @property
+    def channel_mention(self) -> str:
+        return f"<#{self.channel_id}>"
+
+
+class MessageLogCache:
+    """
+    Keeps the content of recent messages for guilds with message logging enabled.
+
+    This is independent of the bot's message cache, so busy guilds elsewhere can not push
+    these messages out. Each guild holds at most ``per_guild`` messages, oldest first out.
+    """
+
+    def __init__(self, *, per_guild: int = 1000) -> None:
+        self.per_guild: int = per_guild
+        self._guilds: dict[int, OrderedDict[int, LoggedMessage]] = {}
+
+    def __repr__(self) -> str:
+        return f"<MessageLogCache guilds={len(self._guilds)} messages={len(self)}>"
+
+    def __len__(self) -> int:
+        return sum(len(messages) for messages in self._guilds.values())
+
+    def add(self, guild_id: int, message: LoggedMessage) -> None:
+        messages = self._guilds.get(guild_id)
+        if messages is None:
+            messages = self._guilds[guild_id] = OrderedDict()
+        messages[message.id] = message
+        if len(messages) > self.per_guild:
+            messages.popitem(last=False)
+
+    def get(self, guild_id: int, message_id: int) -> LoggedMessage | None:
+        messages = self._guilds.get(guild_id)
+        return messages.get(message_id) if messages else None
+
+    def pop(self, guild_id: int, message_id: int) -> LoggedMessage | None:
+        messages = self._guilds.get(guild_id)
+        if not messages:
+            return None
+        message = messages.pop(message_id, None)
+        if not messages:
+            del self._guilds[guild_id]
+        return message
+
+    def guild_size(self, guild_id: int) -> int:
+        return len(self._guilds.get(guild_id, ()))
+
+    def discard_channel(self, guild_id: int, channel_id: int) -> None:
+        messages = self._guilds.get(guild_id)
+        if not messages:
+            return
+        for message_id in [message.id for message in messages.values() if message.channel_id == channel_id]:
+            del messages[message_id]
+        if not messages:
+            del self._guilds[guild_id]
+
+    def discard_guild(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
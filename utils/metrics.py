@@ -0,0 +1,223 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import deque
+from typing import Callable, Mapping
+
+__all__ = (
+    "Histogram",
+    "LatencyStats",
+    "LatencyTracker",
+    "MetricsWriter",
+)
+
+# Upper bounds in seconds, from 1ms to 10s.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Counts observations into fixed buckets.
+
+    Percentiles are estimated from the bucket bounds, so they are only as precise as the buckets.
+    """
+
+    __slots__ = ("buckets", "count", "counts", "max", "total")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets: tuple[float, ...] = buckets
+        # The last count is for observations above the largest bucket.
+        self.counts: list[int] = [0] * (len(buckets) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<Histogram count={self.count} mean={self.mean:.4f} max={self.max:.4f}>"
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Estimates the value below which ``percentile`` (0-100) of observations fall.
+        """
+        if not self.count:
+            return 0.0
+        target = self.count * percentile / 100
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts, strict=False):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """
+        Returns (upper bound, observations at or below it) pairs, ending with infinity.
+        """
+        pairs: list[tuple[float, int]] = []
+        seen = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts, strict=True):
+            seen += count
+            pairs.append((bound, seen))
+        return pairs
+
+    def reset(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class LatencyStats:
+    """
+    Keeps the most recent ``window`` timings of one operation, for exact rolling percentiles.
+    """
+
+    __slots__ = ("count", "max", "samples", "total")
+
+    def __init__(self, window: int) -> None:
+        self.samples: deque[float] = deque(maxlen=window)
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+
+    def __repr__(self) -> str:
+        return f"<LatencyStats count={self.count} p50={self.percentile(50):.4f} p95={self.percentile(95):.4f}>"
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[min(int(len(samples) * percentile / 100), len(samples) - 1)]
+
+
+class LatencyTracker:
+    """
+    Rolling latency statistics, keyed by operation name.
+    """
+
+    def __init__(self, *, window: int = 500, max_keys: int = 1000) -> None:
+        self.window: int = window
+        self.max_keys: int = max_keys
+        self._stats: dict[str, LatencyStats] = {}
+
+    def __repr__(self) -> str:
+        return f"<LatencyTracker keys={len(self._stats)}>"
+
+    def __len__(self) -> int:
+        return len(self._stats)
+
+    def get(self, key: str) -> LatencyStats | None:
+        return self._stats.get(key)
+
+    def record(self, key: str, elapsed: float) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            if len(self._stats) >= self.max_keys:
+                return
+            stats = self._stats[key] = LatencyStats(self.window)
+        stats.observe(elapsed)
+
+    def top(
+        self, limit: int = 10, *, by: Callable[[LatencyStats], float] = lambda stats: stats.percentile(95)
+    ) -> list[tuple[str, LatencyStats]]:
+        return sorted(self._stats.items(), key=lambda item: by(item[1]), reverse=True)[:limit]
+
+    def clear(self) -> None:
+        self._stats.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Mapping[str, str] | None) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """
+    Writes metrics in the Prometheus text exposition format.
+    """
+
+    def __init__(self, namespace: str = "alpine") -> None:
+        self.namespace: str = namespace
+        self.lines: list[str] = []
+
+    def _header(self, name: str, kind: str, description: str) -> str:
+        name = f"{self.namespace}_{name}"
+        self.lines.append(f"# HELP {name} {description}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        return name
+
+    def gauge(self, name: str, description: str, samples: Mapping[str, float] | float, *, label: str = "") -> None:
+        self._samples(name, "gauge", description, samples, label)
+
+    def counter(self, name: str, description: str, samples: Mapping[str, float] | float, *, label: str = "") -> None:
+        self._samples(name, "counter", description, samples, label)
+
+    def _samples(self, name: str, kind: str, description: str, samples: Mapping[str, float] | float, label: str) -> None:
+        name = self._header(name, kind, description)
+        if not isinstance(samples, Mapping):
+            self.lines.append(f"{name} {samples}")
+            return
+        for value, sample in samples.items():
+            self.lines.append(f"{name}{_labels({label: value})} {sample}")
+
+    def histogram(
+        self, name: str, description: str, histograms: Mapping[str, Histogram] | Histogram, *, label: str = ""
+    ) -> None:
+        name = self._header(name, "histogram", description)
+        if isinstance(histograms, Histogram):
+            histograms = {"": histograms}
+        for value, histogram in histograms.items():
+            labels = {label: value} if label else {}
+            for bound, count in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {histogram.total}")
+            self.lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines) + "\n"
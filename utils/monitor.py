@@ -0,0 +1,162 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from contextvars import ContextVar
+
+from .metrics import Histogram
+
+__all__ = (
+    "LoopMonitor",
+    "Stall",
+    "current_invocation",
+)
+
+_log = logging.getLogger("alpine")
+
+# Set while a command runs, so a stall can be attributed to it.
+current_invocation: ContextVar[str | None] = ContextVar("current_invocation", default=None)
+
+LAG_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Stall:
+    __slots__ = ("duration", "source", "stack", "when")
+
+    def __init__(self, source: str, stack: str) -> None:
+        self.source: str = source
+        self.stack: str = stack
+        self.duration: float = 0.0
+        self.when: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+
+    def __repr__(self) -> str:
+        return f"<Stall source={self.source!r} duration={self.duration:.3f}>"
+
+
+def _attribute(task: asyncio.Task | None) -> str:
+    if task is None:
+        return "loop callback"
+    command = task.get_context().get(current_invocation)
+    if command is not None:
+        return f"command {command}"
+    name = task.get_name()
+    if name.startswith("discord.py: "):
+        return f"listener {name.removeprefix('discord.py: ')}"
+    return f"task {name}"
+
+
+class LoopMonitor:
+    """
+    Samples event loop lag and captures whatever is blocking the loop.
+
+    A task records a tick every ``interval`` seconds. A watchdog thread checks those ticks, and once
+    the loop has not ticked for ``threshold`` seconds it captures the running task and the loop
+    thread's stack. The stall's duration is filled in when the loop recovers.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        threshold: float = 0.25,
+        window: int = 3000,
+        max_stalls: int = 50,
+    ) -> None:
+        self.interval: float = interval
+        self.threshold: float = threshold
+        self.lag: float = 0.0
+        self.histogram: Histogram = Histogram(LAG_BUCKETS)
+        self.recent: deque[float] = deque(maxlen=window)
+        self.stalls: deque[Stall] = deque(maxlen=max_stalls)
+        self.stall_count: int = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread_id: int | None = None
+        self._last_tick: float = time.monotonic()
+        self._pending: Stall | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped: threading.Event = threading.Event()
+
+    def __repr__(self) -> str:
+        return f"<LoopMonitor lag={self.lag:.4f} stalls={len(self.stalls)}>"
+
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample(), name="alpine: loop monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="alpine-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def percentile(self, percentile: float) -> float:
+        """
+        Returns the lag below which ``percentile`` (0-100) of the recent samples fall.
+        """
+        if not self.recent:
+            return 0.0
+        samples = sorted(self.recent)
+        return samples[min(int(len(samples) * percentile / 100), len(samples) - 1)]
+
+    async def _sample(self) -> None:
+        interval = self.interval
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._last_tick = now
+
+            self.lag = lag = max(now - start - interval, 0.0)
+            self.recent.append(lag)
+            self.histogram.observe(lag)
+
+            stall = self._pending
+            if stall is not None:
+                self._pending = None
+                stall.duration = lag
+                self.stalls.append(stall)
+                self.stall_count += 1
+                _log.warning(f"Event loop blocked for {lag * 1000:.0f}ms by {stall.source}:\n{stall.stack}")
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if self._pending is None and time.monotonic() - self._last_tick >= self.threshold:
+                self._pending = self._capture()
+
+    def _capture(self) -> Stall | None:
+        assert self._loop is not None and self._thread_id is not None
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is None:
+            return None
+        stack = "".join(traceback.StackSummary.extract(traceback.walk_stack(frame), limit=12).format()[::-1])
+        return Stall(_attribute(asyncio.current_task(self._loop)), stack)
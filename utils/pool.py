@@ -0,0 +1,263 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import datetime
+import inspect
+import logging
+import os
+import sys
+import time
+from collections import deque
+from types import FrameType
+from typing import TYPE_CHECKING, Any, Generator
+
+from .metrics import Histogram
+
+if TYPE_CHECKING:
+    import asyncpg
+    from asyncpg.pool import PoolConnectionProxy
+
+__all__ = (
+    "InstrumentedConnection",
+    "InstrumentedPool",
+    "SlowQuery",
+)
+
+_log = logging.getLogger("alpine")
+
+OTHER_STATEMENTS = "<other>"
+
+
+UTILS = os.path.dirname(__file__)
+
+
+def _describe(frame: FrameType) -> str:
+    return f"{os.path.relpath(frame.f_code.co_filename)}:{frame.f_lineno} in {frame.f_code.co_name}"
+
+
+def _call_site() -> str:
+    """
+    Finds the first frame outside of this module, asyncpg and contextlib.
+
+    Queries made through helpers in utils, such as the cache's writes, are attributed to the
+    first caller outside of utils, followed by the helper that ran them.
+    """
+    frame = sys._getframe(1)
+    site: FrameType | None = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if f"{os.sep}asyncio{os.sep}" in filename and not frame.f_code.co_flags & inspect.CO_COROUTINE:
+            # The event loop running the task, nothing above it awaited the query.
+            break
+        if filename != __file__ and "asyncpg" not in filename and not filename.endswith("contextlib.py"):
+            if site is None:
+                site = frame
+            if os.path.dirname(filename) != UTILS:
+                return _describe(frame) if frame is site else f"{_describe(frame)} via {_describe(site)}"
+        frame = frame.f_back
+    return _describe(site) if site is not None else "unknown"
+
+
+class SlowQuery:
+    __slots__ = ("call_site", "elapsed", "query", "when")
+
+    def __init__(self, query: str, elapsed: float, call_site: str) -> None:
+        self.query: str = query
+        self.elapsed: float = elapsed
+        self.call_site: str = call_site
+        self.when: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+
+    def __repr__(self) -> str:
+        return f"<SlowQuery elapsed={self.elapsed:.3f} call_site={self.call_site!r}>"
+
+
+class InstrumentedConnection:
+    """
+    Wraps a pool connection, timing every query run through it.
+    """
+
+    __slots__ = ("connection", "pool")
+
+    def __init__(self, connection: PoolConnectionProxy, pool: InstrumentedPool) -> None:
+        self.connection: PoolConnectionProxy = connection
+        self.pool: InstrumentedPool = pool
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.connection, name)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        start = time.perf_counter()
+        try:
+            return await self.connection.execute(query, *args, timeout=timeout)
+        finally:
+            self.pool.record(query, time.perf_counter() - start)
+
+    async def executemany(self, command: str, args: Any, *, timeout: float | None = None) -> None:
+        start = time.perf_counter()
+        try:
+            return await self.connection.executemany(command, args, timeout=timeout)
+        finally:
+            self.pool.record(command, time.perf_counter() - start)
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list[asyncpg.Record]:
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetch(query, *args, timeout=timeout)
+        finally:
+            self.pool.record(query, time.perf_counter() - start)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> asyncpg.Record | None:
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetchrow(query, *args, timeout=timeout)
+        finally:
+            self.pool.record(query, time.perf_counter() - start)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: float | None = None) -> Any:
+        start = time.perf_counter()
+        try:
+            return await self.connection.fetchval(query, *args, column=column, timeout=timeout)
+        finally:
+            self.pool.record(query, time.perf_counter() - start)
+
+
+class _AcquireContext:
+    __slots__ = ("connection", "pool", "timeout")
+
+    def __init__(self, pool: InstrumentedPool, timeout: float | None) -> None:
+        self.pool: InstrumentedPool = pool
+        self.timeout: float | None = timeout
+        self.connection: InstrumentedConnection | None = None
+
+    async def __aenter__(self) -> InstrumentedConnection:
+        self.connection = await self.pool._acquire(self.timeout)
+        return self.connection
+
+    async def __aexit__(self, *args: Any) -> None:
+        assert self.connection is not None
+        await self.pool.release(self.connection)
+        self.connection = None
+
+    def __await__(self) -> Generator[Any, None, InstrumentedConnection]:
+        return self.pool._acquire(self.timeout).__await__()
+
+
+class InstrumentedPool:
+    """
+    Wraps an asyncpg pool to record query latency, acquire wait time and slow queries.
+
+    Latency is tracked per statement text. Once ``max_statements`` distinct statements have been
+    seen, the rest are grouped together so ad-hoc queries cannot grow the stats without bound.
+    """
+
+    def __init__(
+        self,
+        pool: asyncpg.Pool,
+        *,
+        slow_query: float = 0.25,
+        max_statements: int = 500,
+        max_slow_queries: int = 50,
+    ) -> None:
+        self.pool: asyncpg.Pool = pool
+        self.slow_query: float = slow_query
+        self.max_statements: int = max_statements
+        self.statements: dict[str, Histogram] = {}
+        self.acquire_wait: Histogram = Histogram()
+        self.slow_queries: deque[SlowQuery] = deque(maxlen=max_slow_queries)
+        self.waiting: int = 0
+
+    def __repr__(self) -> str:
+        return f"<InstrumentedPool size={self.size} in_use={self.in_use} waiting={self.waiting}>"
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.pool, name)
+
+    @property
+    def size(self) -> int:
+        return self.pool.get_size()
+
+    @property
+    def idle(self) -> int:
+        return self.pool.get_idle_size()
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self.idle
+
+    @property
+    def max_size(self) -> int:
+        return self.pool.get_max_size()
+
+    def record(self, query: str, elapsed: float) -> None:
+        key = " ".join(query.split())
+        histogram = self.statements.get(key)
+        if histogram is None:
+            if len(self.statements) >= self.max_statements:
+                key = OTHER_STATEMENTS
+                histogram = self.statements.get(key)
+            if histogram is None:
+                histogram = self.statements[key] = Histogram()
+        histogram.observe(elapsed)
+
+        if elapsed >= self.slow_query:
+            call_site = _call_site()
+            self.slow_queries.append(SlowQuery(key, elapsed, call_site))
+            _log.warning(f"Slow query ({elapsed * 1000:.1f}ms) from {call_site}: {key}")
+
+    async def _acquire(self, timeout: float | None) -> InstrumentedConnection:
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            connection = await self.pool.acquire(timeout=timeout)
+        finally:
+            self.waiting -= 1
+            self.acquire_wait.observe(time.perf_counter() - start)
+        return InstrumentedConnection(connection, self)
+
+    def acquire(self, *, timeout: float | None = None) -> _AcquireContext:
+        return _AcquireContext(self, timeout)
+
+    async def release(self, connection: InstrumentedConnection, *, timeout: float | None = None) -> None:
+        await self.pool.release(connection.connection, timeout=timeout)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        async with self.acquire() as connection:
+            return await connection.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args: Any, *, timeout: float | None = None) -> None:
+        async with self.acquire() as connection:
+            return await connection.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list[asyncpg.Record]:
+        async with self.acquire() as connection:
+            return await connection.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> asyncpg.Record | None:
+        async with self.acquire() as connection:
+            return await connection.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: float | None = None) -> Any:
+        async with self.acquire() as connection:
+            return await connection.fetchval(query, *args, column=column, timeout=timeout)
+
+    def reset(self) -> None:
+        self.statements.clear()
+        self.acquire_wait.reset()
+        self.slow_queries.clear()
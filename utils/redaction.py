@@ -0,0 +1,65 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Iterable, Mapping
+
+__all__ = ("Redactor",)
+
+
+class Redactor:
+    """
+    Replaces configured secrets and filesystem paths in text in a single pass.
+    """
+
+    __slots__ = ("_leading", "_pattern", "_replacements")
+
+    def __init__(self, replacements: Mapping[str, str]) -> None:
+        self._replacements: dict[str, str] = {key: value for key, value in replacements.items() if key}
+        self._leading: frozenset[str] = frozenset(key[0] for key in self._replacements)
+        # Longest first, so a path is not cut short by one of its parent directories.
+        candidates = sorted(self._replacements, key=len, reverse=True)
+        self._pattern: re.Pattern[str] | None = (
+            re.compile("|".join(map(re.escape, candidates))) if candidates else None
+        )
+
+    def __repr__(self) -> str:
+        return f"<Redactor candidates={len(self._replacements)}>"
+
+    def __len__(self) -> int:
+        return len(self._replacements)
+
+    @property
+    def candidates(self) -> list[str]:
+        return list(self._replacements)
+
+    @classmethod
+    def from_settings(cls, settings: Mapping[str, Any], paths: Iterable[str] = ()) -> Redactor:
+        replacements: dict[str, str] = {path: "[PATH]" for path in paths if isinstance(path, str)}
+        for section in ("bot_tokens", "api_tokens", "webhooks"):
+            for token in settings.get(section, {}).values():
+                if isinstance(token, str):
+                    replacements[token] = "[configuration token omitted]"
+        return cls(replacements)
+
+    def redact(self, content: str) -> str:
+        if self._pattern is None or self._leading.isdisjoint(content):
+            return content
+        return self._pattern.sub(lambda match: self._replacements[match[0]], content)
@@ -0,0 +1,95 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable
+
+__all__ = ("StatementRegistry",)
+
+
+class StatementRegistry:
+    """
+    Builds the UPDATE statements used by the cache, one per table and set of columns.
+
+    Columns are sorted so the same set always produces the same query text. The registry does not
+    prepare statements itself, that is left to asyncpg's per-connection statement cache, which may
+    evict a shape and prepare it again. It counts how many times each shape is run instead.
+    """
+
+    def __init__(self) -> None:
+        self._tables: dict[str, tuple[str, frozenset[str]]] = {}
+        self._statements: dict[tuple[str, tuple[str, ...], bool], str] = {}
+        # Calls to update(), including ones answered from the registry.
+        self.lookups: int = 0
+        # query -> rows written with it
+        self.executions: dict[str, int] = {}
+
+    def __repr__(self) -> str:
+        return f"<StatementRegistry statements={self.statements} lookups={self.lookups} executed={self.executed}>"
+
+    @property
+    def statements(self) -> int:
+        return len(self._statements)
+
+    @property
+    def executed(self) -> int:
+        return sum(self.executions.values())
+
+    def record(self, query: str, rows: int = 1) -> None:
+        self.executions[query] = self.executions.get(query, 0) + rows
+
+    def register(self, table: str, primary_key: str, columns: Iterable[str]) -> None:
+        self._tables[table] = (primary_key, frozenset(columns))
+
+    def check(self, table: str, columns: Iterable[str]) -> str:
+        """
+        Ensures every column belongs to the table, returning the table's primary key.
+        """
+        try:
+            primary_key, allowed = self._tables[table]
+        except KeyError:
+            raise ValueError(f"{table} is not a registered table") from None
+        columns = set(columns)
+        if not columns:
+            raise ValueError("At least one column must be updated")
+        if unknown := columns - allowed:
+            raise ValueError(f"Unknown columns for {table}: {', '.join(sorted(unknown))}")
+        return primary_key
+
+    def update(self, table: str, columns: Iterable[str], *, returning: bool = True) -> tuple[str, tuple[str, ...]]:
+        """
+        Returns the UPDATE query for these columns and the order their values are expected in.
+
+        The primary key is always ``$1``.
+        """
+        ordered = tuple(sorted(columns))
+        key = (table, ordered, returning)
+        self.lookups += 1
+
+        query = self._statements.get(key)
+        if query is not None:
+            return query, ordered
+
+        primary_key = self.check(table, ordered)
+        fmt = ", ".join(f"{column} = ${number}" for number, column in enumerate(ordered, start=2))
+        query = f"UPDATE {table} SET {fmt} WHERE {primary_key} = $1"
+        if returning:
+            query += " RETURNING *"
+        self._statements[key] = query
+        return query, ordered
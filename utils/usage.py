@@ -0,0 +1,156 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .database import Database
+
+__all__ = ("CommandUsage",)
+
+_log = logging.getLogger("alpine")
+
+# (command, guild_id, hour)
+UsageKey = tuple[str, int, datetime.datetime]
+
+
+def _hour(when: datetime.datetime) -> datetime.datetime:
+    return when.replace(minute=0, second=0, microsecond=0)
+
+
+class CommandUsage:
+    """
+    Counts command uses per command, guild and hour, and writes the counts to Postgres in batches.
+    """
+
+    create_table = """
+                   CREATE TABLE IF NOT EXISTS command_usage (
+                       command TEXT NOT NULL,
+                       guild_id BIGINT NOT NULL,
+                       hour TIMESTAMPTZ NOT NULL,
+                       uses INTEGER NOT NULL DEFAULT 0,
+                       PRIMARY KEY (command, guild_id, hour)
+                   );
+                   CREATE INDEX IF NOT EXISTS command_usage_hour_idx ON command_usage (hour);
+                   """
+    upsert = """
+             INSERT INTO command_usage (command, guild_id, hour, uses)
+             VALUES ($1, $2, $3, $4)
+             ON CONFLICT (command, guild_id, hour)
+             DO UPDATE SET uses = command_usage.uses + EXCLUDED.uses
+             """
+
+    def __init__(self, database: Database, *, interval: float = 60.0) -> None:
+        self.database: Database = database
+        self.interval: float = interval
+        # Turned off when the table could not be created, flushes would never succeed.
+        self.enabled: bool = True
+        self._counts: dict[UsageKey, int] = {}
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._wake: asyncio.Event = asyncio.Event()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def __repr__(self) -> str:
+        return f"<CommandUsage pending={len(self._counts)}>"
+
+    async def setup(self) -> None:
+        # Usage stats are optional, a failure here must not stop the cache from loading.
+        try:
+            await self.database.pool.execute(self.create_table)
+        except Exception:
+            self.enabled = False
+            _log.exception("Failed to create the command_usage table, usage will not be saved")
+
+    def record(self, command: str, guild_id: int, when: datetime.datetime) -> None:
+        if not self.enabled:
+            return
+        key = (command, guild_id, _hour(when))
+        self._counts[key] = self._counts.get(key, 0) + 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+        except TimeoutError:
+            pass
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            counts, self._counts = self._counts, {}
+            if not counts:
+                return
+            try:
+                await self.database.pool.executemany(
+                    self.upsert, [(command, guild_id, hour, uses) for (command, guild_id, hour), uses in counts.items()]
+                )
+            except Exception:
+                for key, uses in counts.items():
+                    self._counts[key] = self._counts.get(key, 0) + uses
+                _log.exception(f"Failed to write {len(counts)} command usage buckets")
+
+    async def close(self) -> None:
+        # Wakes the pending flush instead of cancelling it, which could lose counts it is writing.
+        if self._flush_task is not None and not self._flush_task.done():
+            self._wake.set()
+            await self._flush_task
+        await self.flush()
+
+    async def top_commands(
+        self,
+        since: datetime.datetime,
+        until: datetime.datetime | None = None,
+        *,
+        guild_id: int | None = None,
+        limit: int | None = 10,
+    ) -> list[tuple[str, int]]:
+        """
+        Returns the most used commands between two times, including uses that have not been written yet.
+
+        Times are rounded down to the hour.
+        """
+        since = _hour(since)
+        until = _hour(until) if until else None
+        query = """
+                SELECT command, SUM(uses)::BIGINT AS uses
+                FROM command_usage
+                WHERE hour >= $1
+                AND ($2::TIMESTAMPTZ IS NULL OR hour <= $2)
+                AND ($3::BIGINT IS NULL OR guild_id = $3)
+                GROUP BY command
+                """
+        totals: dict[str, int] = {
+            record["command"]: record["uses"] for record in await self.database.pool.fetch(query, since, until, guild_id)
+        }
+        for (command, guild, hour), uses in self._counts.items():
+            if hour < since or (until and hour > until) or (guild_id is not None and guild != guild_id):
+                continue
+            totals[command] = totals.get(command, 0) + uses
+
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    async def total_uses(
+        self, since: datetime.datetime, until: datetime.datetime | None = None, *, guild_id: int | None = None
+    ) -> int:
+        return sum(uses for _, uses in await self.top_commands(since, until, guild_id=guild_id, limit=None))
@@ -0,0 +1,291 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any
+
+import aiohttp
+import discord
+from discord import ui
+from discord.utils import MISSING
+
+__all__ = (
+    "LogEntry",
+    "WebhookDispatcher",
+)
+
+_log = logging.getLogger("alpine")
+
+NO_MENTIONS = discord.AllowedMentions.none()
+
+# Limits of a single components message.
+MAX_COMPONENTS = 40
+MAX_TEXT_LENGTH = 4000
+MAX_ENTRIES = 10
+
+
+def _weight(item: Any) -> int:
+    children = getattr(item, "children", ())
+    accessory = getattr(item, "accessory", None)
+    return 1 + sum(_weight(child) for child in children) + (_weight(accessory) if accessory is not None else 0)
+
+
+def _text_length(item: Any) -> int:
+    length = len(item.content) if isinstance(item, ui.TextDisplay) else 0
+    return length + sum(_text_length(child) for child in getattr(item, "children", ()))
+
+
+class LogEntry:
+    __slots__ = ("file", "item", "length", "weight")
+
+    def __init__(self, item: ui.Item[Any], file: discord.File | None = None) -> None:
+        self.item: ui.Item[Any] = item
+        self.file: discord.File | None = file
+        self.weight: int = _weight(item)
+        self.length: int = _text_length(item)
+
+
+class _Destination:
+    __slots__ = (
+        "carry",
+        "dropped",
+        "entries_sent",
+        "idle",
+        "messages_sent",
+        "queue",
+        "retries",
+        "sent_at",
+        "task",
+        "webhook",
+    )
+
+    def __init__(self, webhook: discord.Webhook, max_queue: int) -> None:
+        self.webhook: discord.Webhook = webhook
+        self.queue: asyncio.Queue[LogEntry] = asyncio.Queue(maxsize=max_queue)
+        self.carry: LogEntry | None = None
+        self.sent_at: deque[float] = deque()
+        self.task: asyncio.Task[None] | None = None
+        # Whether the worker is waiting for entries rather than sending.
+        self.idle: bool = False
+        self.messages_sent: int = 0
+        self.entries_sent: int = 0
+        self.retries: int = 0
+        self.dropped: int = 0
+
+
+class WebhookDispatcher:
+    """
+    Sends log entries through one queue per webhook.
+
+    Entries that arrive within ``window`` seconds of each other are merged into a single
+    message, sends are paced to stay under ``rate`` messages every ``per`` seconds, and failed
+    sends are retried with backoff. Queues and their workers are dropped after being idle.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: float = 0.5,
+        max_queue: int = 500,
+        rate: int = 5,
+        per: float = 2.0,
+        max_retries: int = 3,
+        idle_timeout: float = 300.0,
+    ) -> None:
+        self.window: float = window
+        self.max_queue: int = max_queue
+        self.rate: int = rate
+        self.per: float = per
+        self.max_retries: int = max_retries
+        self.idle_timeout: float = idle_timeout
+        self._destinations: dict[str, _Destination] = {}
+        self._closed: bool = False
+        # Counters of destinations that have since gone idle.
+        self._messages_sent: int = 0
+        self._entries_sent: int = 0
+        self._retries: int = 0
+        self._dropped: int = 0
+
+    def __repr__(self) -> str:
+        return f"<WebhookDispatcher destinations={len(self._destinations)} queued={self.queued}>"
+
+    @property
+    def queued(self) -> int:
+        return sum(dest.queue.qsize() + (dest.carry is not None) for dest in self._destinations.values())
+
+    def stats(self) -> dict[str, int]:
+        destinations = self._destinations.values()
+        return {
+            "destinations": len(self._destinations),
+            "queued": self.queued,
+            "messages_sent": self._messages_sent + sum(dest.messages_sent for dest in destinations),
+            "entries_sent": self._entries_sent + sum(dest.entries_sent for dest in destinations),
+            "retries": self._retries + sum(dest.retries for dest in destinations),
+            "dropped": self._dropped + sum(dest.dropped for dest in destinations),
+        }
+
+    def busiest(self, limit: int = 10) -> list[tuple[int, int, int]]:
+        """
+        Returns (webhook ID, queue depth, dropped entries) for the destinations with the deepest queues.
+        """
+        destinations = sorted(self._destinations.values(), key=lambda dest: dest.queue.qsize(), reverse=True)
+        return [(dest.webhook.id, dest.queue.qsize(), dest.dropped) for dest in destinations[:limit]]
+
+    def send(self, webhook: discord.Webhook, item: ui.Item[Any] | str, *, file: discord.File | None = None) -> bool:
+        """
+        Queues a log entry, returning whether it was accepted.
+        """
+        if self._closed:
+            return False
+        if isinstance(item, str):
+            item = ui.TextDisplay(item)
+
+        dest = self._destinations.get(webhook.url)
+        if dest is None:
+            dest = self._destinations[webhook.url] = _Destination(webhook, self.max_queue)
+        try:
+            dest.queue.put_nowait(LogEntry(item, file))
+        except asyncio.QueueFull:
+            dest.dropped += 1
+            return False
+
+        if dest.task is None or dest.task.done():
+            dest.task = asyncio.create_task(self._run(dest), name=f"alpine: webhook {webhook.id}")
+        return True
+
+    async def _next(self, dest: _Destination, timeout: float) -> LogEntry | None:
+        if dest.carry is not None:
+            entry, dest.carry = dest.carry, None
+            return entry
+        try:
+            return dest.queue.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+        if timeout <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(dest.queue.get(), timeout)
+        except TimeoutError:
+            return None
+
+    async def _collect(self, dest: _Destination, first: LogEntry) -> list[LogEntry]:
+        batch = [first]
+        if first.file is not None:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        weight, length = first.weight, first.length
+        while len(batch) < MAX_ENTRIES:
+            entry = await self._next(dest, 0 if self._closed else deadline - loop.time())
+            if entry is None:
+                break
+            if (
+                entry.file is not None
+                or weight + entry.weight > MAX_COMPONENTS
+                or length + entry.length > MAX_TEXT_LENGTH
+            ):
+                dest.carry = entry
+                break
+            batch.append(entry)
+            weight += entry.weight
+            length += entry.length
+        return batch
+
+    async def _wait_for_bucket(self, dest: _Destination) -> None:
+        sent_at = dest.sent_at
+        now = time.monotonic()
+        while sent_at and now - sent_at[0] >= self.per:
+            sent_at.popleft()
+        if len(sent_at) >= self.rate:
+            await asyncio.sleep(self.per - (now - sent_at[0]))
+            sent_at.popleft()
+        sent_at.append(time.monotonic())
+
+    async def _deliver(self, dest: _Destination, batch: list[LogEntry]) -> None:
+        view = ui.LayoutView()
+        for entry in batch:
+            view.add_item(entry.item)
+        file = batch[0].file
+
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_bucket(dest)
+            try:
+                if file is not None:
+                    file.reset()
+                await dest.webhook.send(view=view, file=file or MISSING, allowed_mentions=NO_MENTIONS)
+            except (discord.NotFound, discord.Forbidden):
+                # The webhook is gone, nothing queued for it can be delivered.
+                break
+            except discord.HTTPException as exc:
+                if exc.status < 500 and exc.status != 429:
+                    _log.warning(f"Dropping {len(batch)} log entries for webhook {dest.webhook.id}: {exc}")
+                    break
+            except (aiohttp.ClientError, TimeoutError):
+                pass
+            else:
+                dest.messages_sent += 1
+                dest.entries_sent += len(batch)
+                return
+
+            if attempt < self.max_retries:
+                dest.retries += 1
+                await asyncio.sleep(2**attempt)
+        dest.dropped += len(batch)
+
+    async def _run(self, dest: _Destination) -> None:
+        try:
+            while True:
+                dest.idle = True
+                first = await self._next(dest, 0 if self._closed else self.idle_timeout)
+                dest.idle = False
+                if first is None:
+                    break
+                await self._deliver(dest, await self._collect(dest, first))
+        finally:
+            if dest.queue.empty() and dest.carry is None and self._destinations.get(dest.webhook.url) is dest:
+                del self._destinations[dest.webhook.url]
+                self._messages_sent += dest.messages_sent
+                self._entries_sent += dest.entries_sent
+                self._retries += dest.retries
+                self._dropped += dest.dropped
+
+    async def close(self, timeout: float = 10.0) -> None:
+        """
+        Stops accepting entries and waits up to ``timeout`` seconds for the queues to drain.
+        """
+        self._closed = True
+        tasks = []
+        for dest in self._destinations.values():
+            if dest.task is None or dest.task.done():
+                continue
+            if dest.idle and dest.queue.empty() and dest.carry is None:
+                # Nothing left to send, the worker would otherwise wait out idle_timeout.
+                dest.task.cancel()
+            else:
+                tasks.append(dest.task)
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
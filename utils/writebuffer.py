@@ -0,0 +1,129 @@
+"""
+[Alpine Bot]
+Copyright (C) 2021-present  avizum
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .database import Database
+
+__all__ = ("WriteBuffer",)
+
+_log = logging.getLogger("alpine")
+
+# (table, primary key column, primary key)
+RowKey = tuple[str, str, int]
+
+
+class WriteBuffer:
+    """
+    Coalesces deferred row updates and writes them to Postgres in batches.
+
+    Changes to the same row are merged until the buffer is flushed, which happens
+    ``delay`` seconds after the first queued change or once ``max_pending`` rows are waiting.
+    A failed flush is retried with exponential backoff, up to ``max_backoff`` seconds apart.
+    """
+
+    def __init__(
+        self, database: Database, *, delay: float = 5.0, max_pending: int = 500, max_backoff: float = 300.0
+    ) -> None:
+        self.database: Database = database
+        self.delay: float = delay
+        self.max_pending: int = max_pending
+        self.max_backoff: float = max_backoff
+        self._failures: int = 0
+        self._closed: bool = False
+        self._pending: dict[RowKey, dict[str, Any]] = {}
+        self._full: asyncio.Event = asyncio.Event()
+        self._lock: asyncio.Lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
+
+    def __repr__(self) -> str:
+        return f"<WriteBuffer pending={len(self._pending)} delay={self.delay}>"
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def queue(self, table: str, column: str, key: int, values: dict[str, Any]) -> None:
+        self._pending.setdefault((table, column, key), {}).update(values)
+
+        if len(self._pending) >= self.max_pending:
+            self._full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    def get(self, table: str, column: str, key: int) -> dict[str, Any]:
+        return self._pending.get((table, column, key), {})
+
+    def pop(self, table: str, column: str, key: int) -> dict[str, Any]:
+        return self._pending.pop((table, column, key), {})
+
+    async def _flush_later(self, delay: float | None = None) -> None:
+        try:
+            await asyncio.wait_for(self._full.wait(), timeout=self.delay if delay is None else delay)
+        except TimeoutError:
+            pass
+        self._full.clear()
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            # Rows updating the same set of columns are written with one statement.
+            batches: dict[str, list[tuple[Any, ...]]] = {}
+            for (table, _, key), values in pending.items():
+                query, columns = self.database.statements.update(table, values, returning=False)
+                batches.setdefault(query, []).append((key, *(values[name] for name in columns)))
+
+            try:
+                async with self.database.pool.acquire() as connection, connection.transaction():
+                    for query, rows in batches.items():
+                        await connection.executemany(query, rows)
+                    await connection.executemany(
+                        "SELECT pg_notify($1, $2)",
+                        [self.database.notification(table, key) for table, _, key in pending],
+                    )
+            except Exception:
+                # Keep the changes for the next flush, without overwriting anything queued since.
+                for row, values in pending.items():
+                    self._pending[row] = {**values, **self._pending.get(row, {})}
+                self._failures += 1
+                backoff = min(self.delay * 2**self._failures, self.max_backoff)
+                _log.exception(f"Failed to write {len(pending)} buffered rows, retrying in {backoff:.0f}s")
+                if not self._closed:
+                    # Replaces the task running this flush, if any, so queue() does not start another one.
+                    self._flush_task = asyncio.create_task(self._flush_later(backoff))
+                return
+
+            self._failures = 0
+            for query, rows in batches.items():
+                self.database.statements.record(query, len(rows))
+            _log.debug(f"Wrote {len(pending)} buffered rows in {len(batches)} batches")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._flush_task is not None and not self._flush_task.done():
+            self._full.set()
+            await self._flush_task
+        await self.flush()